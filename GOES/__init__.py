@@ -1,13 +1,13 @@
 name = "GOES"
 from .downloads.download_data import *
 from .processing.processing_data import *
-__all__ = ['show_products','download_file', 'download',
+__all__ = ['download_client', 's3_storage', 'gcs_storage', 'local_storage', 'memory_storage', 'concurrency_controller', 'rate_limiter', 'download_journal', 'local_cache', 'download_metrics', 'show_products', 'product_catalog', 'inventory','download_file', 'download', 'iter_download', 'download_batch', 'follow', 'sync',
            'show_products_from_google_cloud', 'get_data_to_colab',
            'GOES', 'open_dataset', 'open_mfdataset',
-           'get_lonlat','get_lonlatcorner','corner_size_to_center_size',
+           'get_lonlat','get_lonlatcorner','geolocation_cache','corner_size_to_center_size',
            'midpoint_in_x','midpoint_in_y','calculate_corners',
            'find_pixel_of_coordinate',
            'cosine_of_solar_zenith_angle',
            'find_pixels_of_region','create_gridmap',
-           'locate_files','accumulate_in_gridmap']
+           'locate_files','parse_filenames','accumulate_in_gridmap']
 __version__ = '3.4.4'
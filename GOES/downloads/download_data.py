@@ -1,11 +1,11 @@
 # -*- coding: utf-8 -*-
 #-----------------------------------------------------------------------------------------------------------------------------------
 '''
-Description: Downloads GOES-16/17/18/19 data from Amazon Web Services
+Description: Downloads GOES-16/17/18/19 data from Amazon Web Services and Google Cloud
 Author: Joao Henry Huaman Chinchay
 E-mail: joaohenry23@gmail.com
 Created date: Mar 23, 2020
-Modification date: Apr 2, 2025
+Modification date: Oct 18, 2026
 '''
 #-----------------------------------------------------------------------------------------------------------------------------------
 import numpy as np
@@ -13,62 +13,2785 @@ import s3fs
 from datetime import *
 import requests
 import os
-import subprocess
+import io
+import hashlib
+import shutil
+import json
+import sqlite3
+import socket
+import threading
+from collections import deque, OrderedDict
+import time
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
 from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
 
+from ..processing.processing_data import open_dataset, parse_filenames
+
+# minimum size of each byte range when a file is downloaded in parts
+_MIN_PART_SIZE = 8*1000*1000
+
+# maximum number of listings with prefix used for one hour folder
+_MAX_PREFIXES = 16
+
+# maximum number of listings kept in the memory of a download_client (the least recently used are removed)
+_MAX_LISTINGS = 10000
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class _file_stream():
+
+    '''
+
+    Reads a range of bytes of a file object in blocks, in the same way that
+    the content of a response of server is read.
+
+    '''
+
+    def __init__(self, FileObj, start=0, end=None):
+        self.file = FileObj
+        self.file.seek(start)
+        self.remaining = None if end is None else end-start+1
+
+
+    def iter_content(self, chunk_size=1024*1024):
+        while self.remaining is None or self.remaining > 0:
+            size = chunk_size if self.remaining is None else min(chunk_size, self.remaining)
+            chunk = self.file.read(size)
+            if not chunk:
+                break
+            if self.remaining is not None:
+                self.remaining = self.remaining - len(chunk)
+            yield chunk
+
+
+    def close(self):
+        self.file.close()
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class s3_storage():
+
+    '''
+
+    Storage of the GOES data in the Amazon Web Services buckets
+    (noaa-goes16, noaa-goes17, noaa-goes18 and noaa-goes19). The folders are
+    listed using s3fs and the files are downloaded using HTTPS.
+
+    '''
+
+    name = 's3://'
+
+    def __init__(self):
+        self.fs = None
+        self.lock = threading.Lock()
+
+
+    def filesystem(self):
+        with self.lock:
+            if self.fs is None:
+                self.fs = s3fs.S3FileSystem(anon=True)
+        return self.fs
+
+
+    def bucket(self, Satellite):
+        return 'noaa-'+Satellite;
+
+
+    def ls(self, client, path, prefix='', start_after=''):
+        if start_after != '':
+            return self._list_after(path, prefix, start_after);
+        try:
+            if prefix == '':
+                # refresh=True because the listings are cached by download_client instead of by s3fs
+                ListFiles = self.filesystem().ls(self.name+path, detail=True, refresh=True)
+            else:
+                ListFiles = list(self.filesystem().find(self.name+path, prefix=prefix, detail=True).values())
+        except FileNotFoundError:
+            return []
+        return [{'name':item['name'], 'size':item['size']} for item in ListFiles if item.get('type','file') == 'file'];
+
+
+    def _list_after(self, path, prefix, start_after):
+        # only the files after start_after are requested to the server (StartAfter of ListObjectsV2)
+        bucket, _, folder = path.partition('/')
+        params = {'Bucket':bucket, 'Prefix':folder+prefix, 'StartAfter':start_after.partition('/')[2]}
+        ListFiles = []
+        while True:
+            response = self.filesystem().call_s3('list_objects_v2', **params)
+            ListFiles.extend([{'name':bucket+'/'+item['Key'], 'size':item['Size']} for item in response.get('Contents', []) if '/' not in item['Key'][len(folder):]])
+            if response.get('IsTruncated', False) == False:
+                break
+            params['ContinuationToken'] = response['NextContinuationToken']
+        return ListFiles;
+
+
+    def products(self, client, Satellite):
+        return [item.split('/')[-1] for item in self.filesystem().ls(self.name+self.bucket(Satellite)+'/')];
+
+
+    def url(self, key):
+        bucket, _, name = key.partition('/')
+        return 'https://{}.s3.amazonaws.com/{}'.format(bucket, name);
+
+
+    def open(self, client, key, start=0, end=None):
+        return _request_from_offset(client, self.url(key), start, end);
+
+
+    def size(self, client, key):
+        return _request_size(client, self.url(key));
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class gcs_storage():
+
+    '''
+
+    Storage of the GOES data in the Google Cloud buckets
+    (gcp-public-data-goes-16, -17, -18 and -19). The folders are listed
+    using the JSON API of Google Cloud Storage and the files are downloaded
+    using HTTPS, so gsutil is not required.
+
+    '''
+
+    name = 'gs://'
+
+    def bucket(self, Satellite):
+        return 'gcp-public-data-goes-'+Satellite[-2:];
+
+
+    def _list(self, client, bucket, prefix, start_after=''):
+        # the objects are requested by pages of 1000, the folders are returned as prefixes
+        URL = 'https://storage.googleapis.com/storage/v1/b/{}/o'.format(bucket)
+        params = {'prefix':prefix, 'delimiter':'/', 'maxResults':1000, 'fields':'items(name,size),prefixes,nextPageToken'}
+        if start_after != '':
+            params['startOffset'] = start_after
+        ListFiles = []
+        ListFolders = []
+        while True:
+            req = client.session.get(URL, params=params, timeout=client.timeout)
+            req.raise_for_status()
+            data = req.json()
+            ListFiles.extend([{'name':bucket+'/'+item['name'], 'size':int(item['size'])} for item in data.get('items', [])])
+            ListFolders.extend(data.get('prefixes', []))
+            if 'nextPageToken' not in data:
+                break
+            params['pageToken'] = data['nextPageToken']
+        return ListFiles, ListFolders;
+
+
+    def ls(self, client, path, prefix='', start_after=''):
+        bucket, _, folder = path.partition('/')
+        # startOffset includes the object start_after, so it is removed
+        return [item for item in self._list(client, bucket, folder+prefix, start_after.partition('/')[2])[0] if item['name'] > start_after];
+
+
+    def products(self, client, Satellite):
+        return [folder.rstrip('/') for folder in self._list(client, self.bucket(Satellite), '')[1]];
+
+
+    def url(self, key):
+        return 'https://storage.googleapis.com/'+key;
+
+
+    def open(self, client, key, start=0, end=None):
+        return _request_from_offset(client, self.url(key), start, end);
+
+
+    def size(self, client, key):
+        return _request_size(client, self.url(key));
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class local_storage():
+
+    '''
+
+    Storage of the GOES data in a local folder, with the same structure of
+    the Amazon buckets, for example:
+        root/noaa-goes16/ABI-L2-CMIPF/2020/140/18/OR_ABI-L2-CMIPF-M6C13_G16_s20201401800...nc
+    It can be used to work with a copy of the data in a disk or to test the
+    download functions without connection.
+
+    Parameters
+    ----------
+    root : str
+        Folder that contains the folders of buckets.
+
+    '''
+
+    def __init__(self, root):
+        self.root = root
+        self.name = 'file://'+os.path.abspath(root)+'/'
+
+
+    def bucket(self, Satellite):
+        return 'noaa-'+Satellite;
+
+
+    def ls(self, client, path, prefix='', start_after=''):
+        folder = os.path.join(self.root, path)
+        try:
+            ListNames = sorted(os.listdir(folder))
+        except FileNotFoundError:
+            return []
+        path = path.rstrip('/')+'/'
+        return [{'name':path+name, 'size':os.path.getsize(os.path.join(folder, name))} for name in ListNames
+                if name.startswith(prefix) and path+name > start_after and os.path.isfile(os.path.join(folder, name))];
+
+
+    def products(self, client, Satellite):
+        folder = os.path.join(self.root, self.bucket(Satellite))
+        if os.path.isdir(folder) == False:
+            return []
+        return sorted(os.listdir(folder));
+
+
+    def url(self, key):
+        return os.path.join(self.root, key);
+
+
+    def open(self, client, key, start=0, end=None):
+        File = self.url(key)
+        total_size = os.path.getsize(File)
+        if start >= total_size:
+            start = 0
+        return _file_stream(open(File, 'rb'), start, end), start, total_size;
+
+
+    def size(self, client, key):
+        return os.path.getsize(self.url(key));
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class memory_storage():
+
+    '''
+
+    Storage of the GOES data in a dict of python, whose keys are the paths
+    of files with the structure of the Amazon buckets
+    (noaa-goes16/ABI-L2-CMIPF/2020/140/18/OR_...nc) and values are the
+    contents of files. It is useful to test the download functions.
+
+    Parameters
+    ----------
+    files : dict or None, optional, default None
+        Initial files of storage.
+
+    '''
+
+    def __init__(self, files=None):
+        self.files = {}
+        self.name = 'memory://{}/'.format(id(self))
+        if files is not None:
+            for key, data in files.items():
+                self.put(key, data)
+
+
+    def put(self, key, data):
+        self.files[key] = bytes(data)
+
+
+    def bucket(self, Satellite):
+        return 'noaa-'+Satellite;
+
+
+    def ls(self, client, path, prefix='', start_after=''):
+        path = path.rstrip('/')+'/'
+        return [{'name':key, 'size':len(data)} for key, data in sorted(self.files.items()) if key.startswith(path+prefix) and '/' not in key[len(path):] and key > start_after];
+
+
+    def products(self, client, Satellite):
+        bucket = self.bucket(Satellite)+'/'
+        return sorted(set([key[len(bucket):].split('/')[0] for key in self.files if key.startswith(bucket)]));
+
+
+    def url(self, key):
+        return self.name+key;
+
+
+    def open(self, client, key, start=0, end=None):
+        data = self.files[key]
+        if start >= len(data):
+            start = 0
+        return _file_stream(io.BytesIO(data), start, end), start, len(data);
+
+
+    def size(self, client, key):
+        return len(self.files[key]);
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _get_storage(storage):
+
+    '''
+
+    Returns the storage defined by its name ('s3' or 'gcs') or the same
+    storage if it is already an object.
+
+    '''
+
+    if isinstance(storage, str):
+        if storage in ['s3','aws']:
+            return s3_storage();
+        elif storage in ['gcs','gs','google']:
+            return gcs_storage();
+        raise ValueError("storage should be 's3', 'gcs' or a storage object")
+
+    return storage;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class concurrency_controller():
+
+    '''
+
+    Controls the number of files downloaded at the same time using the
+    additive increase / multiplicative decrease (AIMD) rule: the number of
+    downloads increases by one after a round of downloads without errors and
+    it is multiplied by decrease when the server answers with errors
+    (5xx, for example 503 Slow Down) or the connections fail or expire.
+    In that way the downloads stay near the maximum concurrency tolerated
+    by the server.
+
+    Parameters
+    ----------
+    initial : int, optional, default 4
+        Initial number of downloads at the same time.
+
+    minimum : int, optional, default 1
+        Minimum number of downloads at the same time.
+
+    maximum : int, optional, default 64
+        Maximum number of downloads at the same time. The number of workers
+        of download() is also a limit.
+
+    increase : float, optional, default 1.0
+        Number of downloads added after a round of downloads without errors.
+
+    decrease : float, optional, default 0.5
+        Factor applied to the number of downloads when an error happens.
+
+    cooldown : float, optional, default 1.0
+        Minimum time in seconds between two decreases, so a burst of errors
+        of the downloads that were already running is counted once.
+
+    window : int, optional, default 100
+        Number of recent results used to compute the error rate.
+
+    retry_backoff : float, optional, default 0.5
+        Backoff factor of the retries of each request, used instead of the
+        backoff of client. It is small because the controller reduces the
+        number of downloads when the server fails, instead of waiting in
+        each request.
+
+    retry_backoff_max : float, optional, default 4
+        Maximum time in seconds waited between two retries of a request.
+
+    task_retries : int, optional, default 3
+        Number of times that a file whose download failed is downloaded
+        again by download(), after waiting its turn in the controller.
+
+    Example
+    -------
+        client = GOES.download_client(pool_size=32, controller=GOES.concurrency_controller(maximum=32))
+        GOES.download('goes16', 'ABI-L2-CMIPF', DateTimeIni='20200520-000000', DateTimeFin='20200520-235959', channel=['13'], workers=32, client=client)
+        print(client.controller.stats())
+
+    '''
+
+    def __init__(self, initial=4, minimum=1, maximum=64, increase=1.0, decrease=0.5, cooldown=1.0, window=100, retry_backoff=0.5, retry_backoff_max=4.0, task_retries=3):
+        self.minimum = max(minimum, 1)
+        self.maximum = max(maximum, self.minimum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.decreases = 0
+        self.results = deque(maxlen=window)
+        self.last_decrease = 0.0
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.task_retries = task_retries
+        self.condition = threading.Condition()
+
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight = self.in_flight + 1
+
+
+    def release(self, ok=True):
+        with self.condition:
+            self.in_flight = self.in_flight - 1
+            self.requests = self.requests + 1
+            if ok == True:
+                # the limit grows by increase after limit downloads without errors
+                self.results.append(True)
+                self.limit = min(self.limit + self.increase/self.limit, float(self.maximum))
+            else:
+                self._decrease()
+            self.condition.notify_all()
+
+
+    def failure(self):
+        with self.condition:
+            self._decrease()
+            self.condition.notify_all()
+
+
+    def _decrease(self):
+        self.errors = self.errors + 1
+        self.results.append(False)
+        now = time.time()
+        if now-self.last_decrease >= self.cooldown:
+            self.last_decrease = now
+            self.decreases = self.decreases + 1
+            self.limit = max(self.limit*self.decrease, float(self.minimum))
+
+
+    def stats(self):
+
+        '''
+
+        Returns the state of controller as a dict with the current
+        concurrency (number of downloads allowed at the same time), the
+        downloads in flight, the number of downloads finished and errors,
+        the number of decreases and the error rate of the recent results.
+
+        '''
+
+        with self.condition:
+            return {'concurrency':int(self.limit), 'in_flight':self.in_flight, 'requests':self.requests, 'errors':self.errors,
+                    'decreases':self.decreases, 'error_rate':self.results.count(False)/max(len(self.results),1)};
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class rate_limiter():
+
+    '''
+
+    Limits the bandwidth used by the downloads with a token bucket: the
+    bucket is filled with rate bytes per second (up to burst bytes) and each
+    block of data received takes its size from the bucket, waiting if the
+    bucket is empty. All the downloads that use the same rate_limiter (the
+    same client, the same call of download() or several clients that
+    receive the same object) share the same rate.
+
+    Parameters
+    ----------
+    rate : float
+        Maximum rate in bytes per second. Example: 50*1000*1000/8 (50 Mbit/s)
+
+    burst : float or None, optional, default None
+        Maximum number of bytes that can be received at once after a pause.
+        If burst=None it is equal to rate (one second of data).
+
+    Example
+    -------
+        limiter = GOES.rate_limiter(20*1000*1000)
+        client = GOES.download_client(pool_size=16, max_rate=limiter)
+
+    '''
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(rate if burst is None else burst)
+        self.tokens = self.burst
+        self.last_time = time.monotonic()
+        self.lock = threading.Lock()
+
+
+    def consume(self, nbytes):
+        # the bucket can be emptied below zero, each download waits for its own debt, so the total rate is kept
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now-self.last_time)*self.rate)
+            self.last_time = now
+            self.tokens = self.tokens - nbytes
+            wait = -self.tokens/self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _get_limiter(max_rate):
+
+    '''
+
+    Returns a rate_limiter from a rate in bytes per second, or the same
+    limiter if it is already a rate_limiter.
+
+    '''
+
+    if max_rate is None or isinstance(max_rate, rate_limiter):
+        return max_rate;
+
+    return rate_limiter(max_rate);
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class _combined_limiter():
+
+    '''
+
+    Several rate limiters applied to the same download, so each block of
+    data is taken from all of them.
+
+    '''
+
+    def __init__(self, limiters):
+        self.limiters = limiters
+
+
+    def consume(self, nbytes):
+        for limiter in self.limiters:
+            limiter.consume(nbytes)
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _combine_limiters(client_limiter, limiter):
+
+    '''
+
+    Returns the limiter of a download: the limiter of client and the limiter
+    of the call (max_rate), so a call never exceeds the rate of client.
+
+    '''
+
+    if limiter is None or limiter is client_limiter:
+        return client_limiter;
+    if client_limiter is None:
+        return limiter;
+
+    return _combined_limiter([client_limiter, limiter]);
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class local_cache():
+
+    '''
+
+    Cache of GOES files in a local folder shared by several jobs and
+    processes of the same computer. Each file is saved once by its key (the
+    URL of file, like s3://noaa-goes16/ABI-L2-CMIPF/2020/140/18/OR_...nc)
+    and then it is linked or copied to the path_out of each
+    download. The processes take a lock of each file while it is downloaded,
+    so the same file is not downloaded twice at the same time. When the
+    cache exceeds max_size, the least recently used files are removed.
+
+    Parameters
+    ----------
+    path : str
+        Folder of cache. It is created if it does not exist.
+
+    max_size : int or None, optional, default None
+        Maximum size of cache in bytes. If max_size=None the cache is not
+        limited.
+
+    link : boolean, optional, default True
+        If link=True the files are hard linked to path_out (when it is in
+        the same disk of cache), so they do not use more space. The linked
+        files share their content with the cache, so they must not be
+        modified. If link=False the files are copied.
+
+    Example
+    -------
+        cache = GOES.local_cache('/data/goes_cache/', max_size=500*1000*1000*1000)
+        client = GOES.download_client(cache=cache)
+        GOES.download('goes16', 'ABI-L2-CMIPF', DateTimeIni='20200520-180000', channel=['13'], path_out='/data/job1/', client=client)
+
+    '''
+
+    def __init__(self, path, max_size=None, link=True):
+        self.path = path
+        self.max_size = max_size
+        self.link = link
+        self.lock = threading.Lock()
+        self.size = None
+        self.inserts = 0
+        os.makedirs(os.path.join(path, 'locks'), exist_ok=True)
+
+
+    def folder(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, digest[:2], digest);
+
+
+    def get(self, key, file_size=None):
+
+        '''
+
+        Returns the file of key saved in the cache, or None if it is not
+        saved (or its size is not file_size).
+
+        '''
+
+        folder = self.folder(key)
+        try:
+            Names = [name for name in os.listdir(folder) if not name.endswith('.part') and not name.endswith('.lock')]
+        except FileNotFoundError:
+            return None
+        if len(Names) == 0:
+            return None
+        File = os.path.join(folder, Names[0])
+        if file_size is not None and os.path.getsize(File) != file_size:
+            return None
+        # the modification time is used as the time of last use
+        try:
+            os.utime(File)
+        except OSError:
+            return None
+        return File;
+
+
+    def fetch(self, key, name_file, fetch_file, file_size=None):
+
+        '''
+
+        Returns the file of key saved in the cache. If it is not saved,
+        fetch_file(path, name_file) is called to download it in the folder
+        path of the cache. Only one process downloads the same key at the
+        same time, the others wait and use the saved file.
+
+        '''
+
+        File = self.get(key, file_size)
+        if File is not None:
+            return File;
+
+        folder = self.folder(key)
+        # the keys share a fixed number of lock files (by the first two characters of their hash), so the
+        # folder of locks does not grow with the cache
+        with _file_lock(os.path.join(self.path, 'locks', os.path.basename(folder)[:2]+'.lock')):
+            File = self.get(key, file_size)
+            if File is not None:
+                return File;
+            os.makedirs(folder, exist_ok=True)
+            for name in os.listdir(folder):
+                if name not in [name_file, name_file+'.part', name_file+'.lock']:
+                    os.remove(os.path.join(folder, name))
+            fetch_file(folder+os.sep, name_file)
+            File = os.path.join(folder, name_file)
+
+        self._added(os.path.getsize(File))
+
+        return File;
+
+
+    def copy_to(self, File, FileOut):
+
+        '''
+
+        Links or copies a file of cache to FileOut.
+
+        '''
+
+        FileTemp = '{}.{}.{}.tmp'.format(FileOut, os.getpid(), threading.get_ident())
+        try:
+            if self.link == True:
+                os.link(File, FileTemp)
+            else:
+                raise OSError('the files are copied')
+        except OSError:
+            shutil.copyfile(File, FileTemp)
+        os.replace(FileTemp, FileOut)
+
+
+    def _added(self, nbytes):
+        if self.max_size is None:
+            return
+        with self.lock:
+            self.inserts = self.inserts + 1
+            if self.size is not None:
+                self.size = self.size + nbytes
+            # the size saved by other processes is unknown, so the cache is checked again periodically
+            if self.size is not None and self.size <= self.max_size and self.inserts % 100 != 0:
+                return
+        self.evict()
+
+
+    def evict(self):
+
+        '''
+
+        Removes the least recently used files until the cache has at most
+        max_size bytes.
+
+        '''
+
+        # only one process checks the cache at the same time
+        with _file_lock(os.path.join(self.path, 'locks', 'evict.lock')):
+            ListFiles = []
+            for root, folders, names in os.walk(self.path):
+                if os.path.basename(root) == 'locks':
+                    continue
+                for name in names:
+                    # the files that are being downloaded are not removed
+                    if name.endswith('.part') or name.endswith('.lock'):
+                        continue
+                    File = os.path.join(root, name)
+                    try:
+                        stat = os.stat(File)
+                    except FileNotFoundError:
+                        continue
+                    ListFiles.append((stat.st_mtime, stat.st_size, File))
+
+            size = sum([item[1] for item in ListFiles])
+            if self.max_size is not None:
+                now = time.time()
+                for mtime, nbytes, File in sorted(ListFiles):
+                    if size <= self.max_size:
+                        break
+                    # the files added in the last minute can be in use by the process that added them
+                    if now-mtime < 60:
+                        continue
+                    try:
+                        os.remove(File)
+                        os.rmdir(os.path.dirname(File))
+                    except OSError:
+                        pass
+                    size = size - nbytes
+
+        with self.lock:
+            self.size = size
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class _file_lock():
+
+    '''
+
+    Exclusive lock of a file shared by the threads and processes of the same
+    computer. Without fcntl (Windows) only the threads are synchronized. If
+    remove=True the file of lock is removed when the lock is released.
+
+    '''
+
+    # lock of threads and number of users of each path, a path is removed when nobody uses it
+    _locks = {}
+    _guard = threading.Lock()
+
+    def __init__(self, path, remove=False):
+        self.path = path
+        self.remove = remove
+
+
+    def __enter__(self):
+        with _file_lock._guard:
+            self.entry = _file_lock._locks.setdefault(self.path, [threading.Lock(), 0])
+            self.entry[1] = self.entry[1] + 1
+        self.entry[0].acquire()
+        self.fd = None
+        try:
+            while fcntl is not None:
+                self.fd = os.open(self.path, os.O_RDWR|os.O_CREAT, 0o666)
+                fcntl.flock(self.fd, fcntl.LOCK_EX)
+                # if the file was removed or renamed while waiting, the lock is taken again on the current file
+                try:
+                    if os.fstat(self.fd).st_ino == os.stat(self.path).st_ino:
+                        break
+                except FileNotFoundError:
+                    pass
+                os.close(self.fd)
+                self.fd = None
+        except Exception:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+            self._release()
+            raise
+        return self
+
+
+    def __exit__(self, *args):
+        if self.fd is not None:
+            # the file is removed while the lock is held, the processes that wait take the lock again on a new file
+            if self.remove == True:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+        self._release()
+
+
+    def _release(self):
+        self.entry[0].release()
+        with _file_lock._guard:
+            self.entry[1] = self.entry[1] - 1
+            if self.entry[1] == 0:
+                del _file_lock._locks[self.path]
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class download_metrics():
+
+    '''
+
+    Collects the metrics of the listings and downloads made with a
+    download_client, to know if a download is limited by the listings, by
+    the latency of server or by the bandwidth.
+
+    Each listing of an hour folder is saved in listings as a dict with:
+        'path' : folder listed (with the prefix of names, if any)
+        'time' : time of listing in seconds (0 if it was reused from the cache)
+        'files' : number of files listed
+        'cached' : True if the listing was reused
+
+    Each file is saved in files as a dict with:
+        'name' : name of file
+        'key' : key or URL of file
+        'storage' : name of storage (s3://, gs://, ...)
+        'status' : 'downloaded', 'overwritten', 'cached' (taken from the cache
+                   of client), 'skipped' (it already existed) or 'failed'
+        'size' : size of file in bytes
+        'bytes' : bytes received from the server
+        'parts' : number of byte ranges downloaded at the same time
+        'ttfb' : time to first byte in seconds (until the server answers
+                 the first request)
+        'transfer_time' : time in seconds from the first byte to the end
+        'total_time' : time in seconds of whole download
+        'throughput' : bytes per second during the transfer
+        'retries' : number of requests repeated by errors of server or
+                    interrupted connections
+        'error' : error message if status is 'failed'
+
+    Parameters
+    ----------
+    callback : function or None, optional, default None
+        Function called with each dict when it is saved, as
+        callback(record), where record['type'] is 'listing' or 'file'. It
+        is called from the threads of downloads, so it must be fast.
+
+    Example
+    -------
+        metrics = GOES.download_metrics()
+        client = GOES.download_client(pool_size=16, metrics=metrics)
+        GOES.download('goes16', 'ABI-L2-CMIPF', DateTimeIni='20200520-000000', DateTimeFin='20200520-060000', channel=['13'], workers=16, client=client)
+        print(metrics.summary())
+
+    '''
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.lock = threading.Lock()
+        self.reset()
+
+
+    def reset(self):
+
+        '''
+
+        Removes the metrics saved and starts a new run.
+
+        '''
+
+        with self.lock:
+            self.listings = []
+            self.files = []
+            self.start_time = time.time()
+            self.last_time = self.start_time
+
+
+    def add(self, record):
+        with self.lock:
+            if record['type'] == 'listing':
+                self.listings.append(record)
+            else:
+                self.files.append(record)
+            self.last_time = time.time()
+        if self.callback is not None:
+            self.callback(record)
+
+
+    def summary(self):
+
+        '''
+
+        Returns the aggregated metrics of run as a dict with the number of
+        files of each status, the bytes received, the time of run (from the
+        creation or reset until the last metric saved), the time spent
+        listing the folders, the throughput of run (bytes per second), the
+        mean, median (p50), p95 and maximum of time to first byte and
+        transfer time of the files, and the number of retries.
+
+        '''
+
+        with self.lock:
+            Files = list(self.files)
+            Listings = list(self.listings)
+            wall_time = self.last_time-self.start_time
+
+        Summary = {'files':len(Files)}
+        for status in ['downloaded', 'overwritten', 'cached', 'skipped', 'failed']:
+            Summary[status] = len([item for item in Files if item['status'] == status])
+
+        nbytes = sum([item['bytes'] for item in Files])
+        Summary['bytes'] = nbytes
+        Summary['size'] = sum([item['size'] for item in Files if item['size'] is not None])
+        Summary['wall_time'] = wall_time
+        Summary['throughput'] = nbytes/wall_time if wall_time > 0 else 0.0
+
+        Fetched = [item['time'] for item in Listings if item['cached'] == False]
+        Summary['listings'] = len(Listings)
+        Summary['listings_cached'] = len(Listings)-len(Fetched)
+        Summary['listing_time'] = sum(Fetched)
+        Summary['listing_time_max'] = max(Fetched) if len(Fetched) > 0 else 0.0
+
+        for name in ['ttfb', 'transfer_time']:
+            Values = np.array([item[name] for item in Files if item[name] is not None], dtype=np.float64)
+            if Values.size == 0:
+                Summary[name] = {'mean':None, 'p50':None, 'p95':None, 'max':None}
+            else:
+                Summary[name] = {'mean':float(Values.mean()), 'p50':float(np.percentile(Values, 50)), 'p95':float(np.percentile(Values, 95)), 'max':float(Values.max())}
+
+        Summary['retries'] = sum([item['retries'] for item in Files])
+
+        return Summary;
+
+
+    def report(self):
+
+        '''
+
+        Prints the summary of run.
+
+        '''
+
+        Summary = self.summary()
+        print('Files: {} ({} downloaded, {} overwritten, {} cached, {} skipped, {} failed)'.format(Summary['files'], Summary['downloaded'], Summary['overwritten'], Summary['cached'], Summary['skipped'], Summary['failed']))
+        print('Data received: {:.1f} MB in {:.1f}s ({:.2f} MB/s)'.format(Summary['bytes']/1e6, Summary['wall_time'], Summary['throughput']/1e6))
+        print('Listings: {} ({} reused), {:.1f}s listing (max {:.2f}s)'.format(Summary['listings'], Summary['listings_cached'], Summary['listing_time'], Summary['listing_time_max']))
+        for name, label in [('ttfb','Time to first byte'), ('transfer_time','Transfer time')]:
+            if Summary[name]['mean'] is not None:
+                print('{}: mean {:.3f}s, p50 {:.3f}s, p95 {:.3f}s, max {:.3f}s'.format(label, Summary[name]['mean'], Summary[name]['p50'], Summary[name]['p95'], Summary[name]['max']))
+        print('Retries: {}'.format(Summary['retries']))
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class _file_metrics():
+
+    '''
+
+    Metrics of the download of one file, see download_metrics.
+
+    '''
+
+    def __init__(self, URL, name_file, storage=''):
+        self.URL = URL
+        self.name_file = name_file
+        self.storage = storage
+        self.status = None
+        self.size = None
+        self.bytes = 0
+        self.parts = 1
+        self.retries = 0
+        self.ttfb = None
+        self.start_time = time.time()
+        self.lock = threading.Lock()
+
+
+    def opened(self, req):
+        # called when the server answers a request of file
+        with self.lock:
+            if self.ttfb is None:
+                self.ttfb = time.time()-self.start_time
+            # retries made by urllib3 before the answer
+            retries = getattr(getattr(req, 'raw', None), 'retries', None)
+            if retries is not None:
+                self.retries = self.retries + len(retries.history)
+
+
+    def retry(self):
+        with self.lock:
+            self.retries = self.retries + 1
+
+
+    def received(self, nbytes):
+        with self.lock:
+            self.bytes = self.bytes + nbytes
+
+
+    def record(self, error=None):
+        total_time = time.time()-self.start_time
+        transfer_time = None if self.ttfb is None else total_time-self.ttfb
+        if transfer_time is not None and transfer_time > 0:
+            throughput = self.bytes/transfer_time
+        else:
+            throughput = None
+        return {'type':'file', 'name':self.name_file, 'key':self.URL, 'storage':self.storage, 'status':'failed' if error is not None else self.status,
+                'size':self.size, 'bytes':self.bytes, 'parts':self.parts, 'ttfb':self.ttfb, 'transfer_time':transfer_time, 'total_time':total_time,
+                'throughput':throughput, 'retries':self.retries, 'error':None if error is None else str(error)};
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class _controlled_retry(Retry):
+
+    '''
+
+    Retry of urllib3 that reports the errors of server (5xx) and the failed
+    connections to the concurrency controller of client. If max_sleep is
+    defined, the time waited between two retries is at most max_sleep.
+
+    '''
+
+    controller = None
+    max_sleep = None
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.controller = self.controller
+        retry.max_sleep = self.max_sleep
+        return retry
+
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if self.max_sleep is not None:
+            backoff = min(backoff, self.max_sleep)
+        return backoff
+
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if self.controller is not None:
+            if error is not None or (response is not None and response.status >= 500):
+                self.controller.failure()
+        return super().increment(method, url, response, error, _pool, _stacktrace);
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class download_client():
+
+    '''
+
+    Keeps the connections used to list and download the GOES data, so they
+    can be shared by show_products(), download_file() and download().
+    Using the same client in several calls reuses the open connections
+    (keep-alive) instead of connecting to the server again for each file.
+
+    Parameters
+    ----------
+    retries : int, optional, default 10
+        Defines the retries number to connect to server.
+        See: https://urllib3.readthedocs.io/en/latest/reference/urllib3.util.html#module-urllib3.util.retry
+
+    backoff: int, optional, default 10
+        A backoff factor to apply between attempts after the second try.
+        See: https://urllib3.readthedocs.io/en/latest/reference/urllib3.util.html#module-urllib3.util.retry
+
+    pool_size : int, optional, default 10
+        Maximum number of connections kept open with the server. It should be
+        equal or greater than the number of workers used in download().
+
+    listing_workers : int, optional, default 16
+        Number of hour folders listed at the same time by download().
+
+    listing_cache : str or None, optional, default None
+        Folder where the listings of the hour folders are saved, so they can
+        be reused by other calls or other sessions of python. The listings
+        of the past hours (ended more than one hour ago) are kept forever,
+        while the listings of the recent hours are reused only during
+        listing_ttl seconds. If listing_cache=None the listings are kept
+        just in the memory of client, with the same rules. The memory of
+        client keeps only the 10000 listings used most recently.
+
+    listing_ttl : float, optional, default 60
+        Time in seconds that the listing of a recent hour is reused.
+
+    controller : concurrency_controller or None, optional, default None
+        Controller of the number of files downloaded at the same time. If it
+        is defined, download() reduces the number of downloads when the
+        server answers with errors and increases it when the downloads are
+        healthy; its state is returned by client.controller.stats(). The
+        requests then use the short backoff of controller instead of
+        backoff, and the failed files are tried again by the controller.
+
+    max_rate : float, rate_limiter or None, optional, default None
+        Maximum rate in bytes per second shared by all the downloads made
+        with the client. A rate_limiter can be given to share the same rate
+        with other clients. If max_rate=None the rate is not limited.
+
+    cache : str, local_cache or None, optional, default None
+        Local cache shared by the downloads of several jobs and processes
+        of the computer (see local_cache). If it is a str, a local_cache
+        without size limit is created in that folder.
+
+    timeout : float, tuple or None, optional, default None
+        Time in seconds to wait for the server to connect and to send data
+        (see requests). The expired requests are retried and counted as
+        errors by the controller. If timeout=None the requests wait forever.
+
+    metrics : download_metrics or None, optional, default None
+        Collector of the metrics of each listing and file downloaded with
+        the client (see download_metrics).
+
+    storage : str or storage object, optional, default 's3'
+        Storage where the data is listed and downloaded. The options are:
+            's3' : Amazon Web Services (s3_storage)
+            'gcs' : Google Cloud (gcs_storage)
+            local_storage(root) : local folder with the structure of buckets
+            memory_storage(files) : dict of python with the files
+
+    Example
+    -------
+        client = GOES.download_client(pool_size=16)
+        GOES.download('goes16', 'ABI-L2-CMIPF', DateTimeIni='20200520-000000', DateTimeFin='20200520-235959', channel=['13'], workers=16, client=client)
+
+    '''
+
+    def __init__(self, retries=10, backoff=10, pool_size=10, listing_workers=16, listing_cache=None, listing_ttl=60, controller=None, max_rate=None, cache=None, timeout=None, metrics=None, storage='s3'):
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.listing_workers = listing_workers
+        self.listing_cache = listing_cache
+        self.listing_ttl = listing_ttl
+        self.controller = controller
+        self.limiter = _get_limiter(max_rate)
+        self.cache = local_cache(cache) if isinstance(cache, str) else cache
+        self.timeout = timeout
+        self.metrics = metrics
+        self.storage = _get_storage(storage)
+        self.listings = OrderedDict()
+        self.lock = threading.Lock()
+
+        if listing_cache is not None and os.path.isdir(listing_cache)==False:
+            os.makedirs(listing_cache, exist_ok=True)
+
+        # with a controller the requests are retried quickly, the controller reduces the number of downloads instead
+        if controller is not None:
+            retries_config = _controlled_retry(total=retries, backoff_factor=controller.retry_backoff, status_forcelist=[500, 502, 503, 504])
+            retries_config.max_sleep = controller.retry_backoff_max
+        else:
+            retries_config = _controlled_retry(total=retries, backoff_factor=backoff, status_forcelist=[500, 502, 503, 504])
+        retries_config.controller = controller
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries_config)
+
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+
+    def ls(self, path, closed=False, prefix=''):
+
+        '''
+
+        Lists the files of a folder of server, reusing the saved listings.
+
+        Parameters
+        ----------
+        path : str
+            Folder of storage. Example: 'noaa-goes16/ABI-L2-CMIPF/2020/140/18/'
+
+        closed : boolean, optional, default False
+            If closed=True the folder will not change anymore (it is a past
+            hour), so its listing is saved without expiration.
+
+        prefix : str, optional, default ''
+            If it is defined, only the files whose name starts with prefix
+            are requested to the server.
+
+        Returns
+        -------
+        ListFiles : list
+            List of dicts with the name and size of each file.
+
+        '''
+
+        if self.metrics is None:
+            return self._cached(self.storage.name+path+prefix, lambda: self.storage.ls(self, path, prefix=prefix), closed=closed);
+
+        Times = []
+        def fetch():
+            start = time.time()
+            ListFiles = self.storage.ls(self, path, prefix=prefix)
+            Times.append(time.time()-start)
+            return ListFiles
+
+        ListFiles = self._cached(self.storage.name+path+prefix, fetch, closed=closed)
+        self.metrics.add({'type':'listing', 'path':path+prefix, 'time':sum(Times), 'files':len(ListFiles), 'cached':len(Times) == 0})
+
+        return ListFiles;
+
+
+    def _cached(self, key, fetch, closed=False, ttl=None, refresh=False):
+        # returns the saved result of key if it is valid, otherwise fetch() is called and its result is saved
+        now = time.time()
+        if ttl is None:
+            ttl = self.listing_ttl
+
+        if refresh == False:
+            with self.lock:
+                listing = self.listings.get(key)
+                if listing is not None:
+                    self.listings.move_to_end(key)
+            if listing is None and self.listing_cache is not None:
+                listing = self._read_listing(key)
+
+            if listing is not None:
+                if listing['closed'] == True or now-listing['time'] < ttl:
+                    return listing['files']
+
+        ListFiles = fetch()
+
+        listing = {'path':key, 'time':now, 'closed':closed, 'files':ListFiles}
+        self._keep_listing(key, listing)
+        if self.listing_cache is not None:
+            self._write_listing(listing)
+
+        return ListFiles
+
+
+    def _listing_file(self, path):
+        return os.path.join(self.listing_cache, hashlib.md5(path.encode('utf-8')).hexdigest()+'.json')
+
+
+    def _read_listing(self, path):
+        try:
+            with open(self._listing_file(path), 'r') as cache_file:
+                listing = json.load(cache_file)
+        except (IOError, ValueError):
+            return None
+        if listing.get('path') != path:
+            return None
+        self._keep_listing(path, listing)
+        return listing
+
+
+    def _keep_listing(self, key, listing):
+        # the listings are kept in memory in order of use, so a long synchronization does not accumulate all its hours
+        with self.lock:
+            self.listings[key] = listing
+            self.listings.move_to_end(key)
+            while len(self.listings) > _MAX_LISTINGS:
+                self.listings.popitem(last=False)
+
+
+    def _write_listing(self, listing):
+        # the listing is written in a temporary file and renamed, so other processes never read it incomplete
+        FileCache = self._listing_file(listing['path'])
+        FileTemp = '{}.{}.{}.tmp'.format(FileCache, os.getpid(), threading.get_ident())
+        with open(FileTemp, 'w') as cache_file:
+            json.dump(listing, cache_file)
+        os.replace(FileTemp, FileCache)
+
+
+    def close(self):
+        self.session.close()
+
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def show_products(client=None):
+
+    '''
+
+    Lists the products available from GOES-16, GOES-17, GOES-18, GOES-19.
+
+    Parameters
+    ----------
+    client : download_client or None, optional, default None
+        Client used to list the products, from its storage. If client=None
+        a new client is created (Amazon Web Services).
+
+    '''
+
+    if client is None:
+        client = download_client()
+
+    # the products of all the satellites are listed at the same time
+    Catalog = product_catalog(client=client)
+    print(' ')
+    for sat in Catalog:
+        print('Products for '+sat+':')
+        for item in Catalog[sat]:
+            if item == 'index.html':
+                print(' ')
+            else:
+                print('\t'+item)
+
+    print('Descriptions of each product is shown in https://docs.opendata.aws/noaa-goes16/cics-readme.html#about-the-data \n')
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def product_catalog(satellites=None, client=None, ttl=86400, refresh=False):
+
+    '''
+
+    Lists the products available of several satellites at the same time.
+    The lists are saved in the client (and in its listing_cache), so the
+    next calls do not request them again to the server.
+
+    Parameters
+    ----------
+    satellites : list or None, optional, default None
+        Satellites whose products are listed. If satellites=None the
+        products of 'goes16', 'goes17', 'goes18' and 'goes19' are listed.
+
+    client : download_client or None, optional, default None
+        Client used to list the products, from its storage. If client=None
+        a new client is created (Amazon Web Services).
+
+    ttl : float, optional, default 86400
+        Time in seconds that the saved lists of products are reused.
+
+    refresh : boolean, optional, default False
+        If refresh=True the products are listed again from the server.
+
+    Returns
+    -------
+    Catalog : dict
+        Dict with the list of products of each satellite.
+
+    '''
+
+    if client is None:
+        client = download_client()
+
+    if satellites is None:
+        satellites = ['goes16','goes17','goes18','goes19']
+
+    def list_products(sat):
+        return client._cached(client.storage.name+client.storage.bucket(sat)+'/#products', lambda: client.storage.products(client, sat), ttl=ttl, refresh=refresh);
+
+    with ThreadPoolExecutor(max_workers=max(len(satellites),1)) as executor:
+        Products = list(executor.map(list_products, satellites))
+
+    return dict(zip(satellites, Products));
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _open_file(client, URL, offset=0, end=None):
+
+    '''
+
+    Opens a file starting from byte offset (until byte end). URL can be a
+    link (http or https) or the key of file in the storage of client.
+    The returned values are the same of _request_from_offset().
+
+    '''
+
+    if URL.startswith('http://') or URL.startswith('https://'):
+        return _request_from_offset(client, URL, offset, end);
+
+    return client.storage.open(client, URL, offset, end);
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _request_from_offset(client, URL, offset, end=None):
+
+    '''
+
+    Requests a file starting from byte offset (until byte end) using the
+    HTTP Range header.
+
+    Returns
+    -------
+    req : requests.Response
+        Streamed response with the content of file from offset.
+
+    offset : int
+        First byte of file sent by the server. It is 0 when the server sends
+        the whole file instead of the requested range.
+
+    total_size : int
+        Size of whole file in bytes.
+
+    '''
+
+    if end is not None:
+        req = client.session.get(URL, stream=True, headers={'Range':'bytes={}-{}'.format(offset, end)}, timeout=client.timeout)
+        req.raise_for_status()
+        if req.status_code != 206:
+            req.close()
+            raise IOError('server does not support byte ranges')
+    elif offset > 0:
+        req = client.session.get(URL, stream=True, headers={'Range':'bytes={}-'.format(offset)}, timeout=client.timeout)
+        if req.status_code == 416:
+            # the partial file is not valid for this file, so it is downloaded from the beginning
+            req.close()
+            offset = 0
+            req = client.session.get(URL, stream=True, timeout=client.timeout)
+    else:
+        req = client.session.get(URL, stream=True, timeout=client.timeout)
+
+    req.raise_for_status()
+
+    if req.status_code == 206:
+        total_size = int(req.headers['content-range'].split('/')[-1])
+    else:
+        offset = 0
+        total_size = int(req.headers['content-length'])
+
+    return req, offset, total_size;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _request_size(client, URL):
+
+    '''
+
+    Requests the size of a file, or None if the server does not support
+    byte ranges.
+
+    '''
+
+    req = client.session.head(URL, allow_redirects=True, timeout=client.timeout)
+    req.raise_for_status()
+    if req.headers.get('accept-ranges') != 'bytes':
+        return None
+    return int(req.headers['content-length']);
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _file_size(client, URL):
+
+    '''
+
+    Returns the size of a file, or None if it can not be downloaded in
+    byte ranges. URL can be a link or the key of file in the storage of client.
+
+    '''
+
+    if URL.startswith('http://') or URL.startswith('https://'):
+        return _request_size(client, URL);
+
+    return client.storage.size(client, URL);
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _iter_chunks(req, chunk_size=1024*1024, limiter=None):
+
+    '''
+
+    Reads the content of a response in blocks of chunk_size bytes, waiting
+    for the rate limiter after each block.
+
+    '''
+
+    for chunk in req.iter_content(chunk_size=chunk_size):
+        if chunk:
+            if limiter is not None:
+                limiter.consume(len(chunk))
+            yield chunk
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _download_parts(client, URL, FilePart, total_size, parts, Progress, chunk_size=1024*1024, limiter=None, metrics=None):
+
+    '''
+
+    Downloads a file splitting it in byte ranges that are requested at the
+    same time. FilePart is created with the size of the whole file and each
+    range is written directly in its position. If FilePart is a bytearray,
+    the ranges are written in it instead of in a file.
+
+    '''
+
+    if metrics is None:
+        metrics = _file_metrics(URL, '')
+    metrics.parts = parts
+
+    if isinstance(FilePart, bytearray):
+        FilePart.extend(bytes(total_size-len(FilePart)))
+    else:
+        with open(FilePart,'wb') as output_file:
+            output_file.truncate(total_size)
+
+    Limits = [total_size*idx//parts for idx in range(parts+1)]
+
+    def download_part(start, end):
+        # each thread has its own file descriptor, so its position is not shared
+        if isinstance(FilePart, bytearray):
+            fd = None
+        else:
+            fd = os.open(FilePart, os.O_WRONLY|getattr(os,'O_BINARY',0))
+        try:
+            pos = start
+            attempt = 0
+            while pos <= end:
+                try:
+                    req, offset, total = _open_file(client, URL, pos, end)
+                    metrics.opened(req)
+                    try:
+                        if offset != pos or total != total_size:
+                            raise IOError('the file changed during the download')
+                        for chunk in _iter_chunks(req, chunk_size, limiter):
+                            if chunk:
+                                if fd is None:
+                                    FilePart[pos:pos+len(chunk)] = chunk
+                                else:
+                                    _write_at(fd, chunk, pos)
+                                pos = pos + len(chunk)
+                                Progress.add(len(chunk))
+                                metrics.received(len(chunk))
+                    finally:
+                        req.close()
+                    if pos <= end and offset == pos:
+                        raise IOError('the file changed during the download')
+                except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError):
+                    # the range continues from the last byte written
+                    if client.controller is not None:
+                        client.controller.failure()
+                    metrics.retry()
+                    attempt = attempt + 1
+                    if attempt > client.retries:
+                        raise
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    with ThreadPoolExecutor(max_workers=parts) as executor:
+        futures = [executor.submit(download_part, Limits[idx], Limits[idx+1]-1) for idx in range(parts)]
+        for future in futures:
+            future.result()
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _write_at(fd, data, pos):
+
+    '''
+
+    Writes data in the position pos of file, without moving the position of
+    other descriptors of the same file.
+
+    '''
+
+    data = memoryview(data)
+    while len(data) > 0:
+        if hasattr(os, 'pwrite'):
+            written = os.pwrite(fd, data, pos)
+        else:
+            os.lseek(fd, pos, os.SEEK_SET)
+            written = os.write(fd, data)
+        data = data[written:]
+        pos = pos + written
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class _download_progress():
+
+    '''
+
+    Keeps the number of bytes downloaded of a file and shows the progress of
+    download at most once every interval seconds, so the progress does not
+    slow down the download. It can be updated from several threads.
+
+    '''
+
+    def __init__(self, name_file, total_size, size=0, size_format='Decimal', show=True, callback=None, interval=0.5):
+        self.name_file = name_file
+        self.total_size = total_size
+        self.size = size
+        self.show = show
+        self.callback = callback
+        self.interval = interval
+        if size_format == 'Binary':
+            self.dsize = 1024*1024
+        else:
+            self.dsize = 1000*1000
+        self.start_time = time.time()
+        self.last_time = 0.0
+        self.lock = threading.Lock()
+
+
+    def add(self, nbytes):
+        with self.lock:
+            self.size = self.size + nbytes
+            self.report(False)
+
+
+    def set(self, size):
+        with self.lock:
+            self.size = size
+            self.report(False)
+
+
+    def finish(self):
+        with self.lock:
+            self.report(True)
+
+
+    def report(self, final):
+        now = time.time()
+        if final == False and now-self.last_time < self.interval:
+            return
+        self.last_time = now
+
+        if self.callback is not None:
+            self.callback(self.name_file, self.size, self.total_size)
+
+        if self.show == True:
+            seconds = int(now-self.start_time)
+            elapsed = '{}m{}s'.format(seconds//60, seconds%60) if seconds>60 else '{}s'.format(seconds)
+            line = '  {} {:3.0f}% {:.1f}MB {}'.format(self.name_file, 100.0*self.size/max(self.total_size,1), self.size/self.dsize, elapsed)
+            if final == True:
+                print(line)
+            else:
+                print(line, end='\r', flush=True)
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _plan_parts(client, URL, parts, file_size=None):
+
+    '''
+
+    Defines the number of byte ranges used to download a file, so that each
+    range has at least _MIN_PART_SIZE bytes.
+
+    Return
+    ------
+    parts : int
+        Number of byte ranges. It is 1 if the file must be downloaded in
+        one request.
+
+    total_size : int or None
+        Size of file in bytes, or None if it is unknown.
+
+    '''
+
+    if parts <= 1:
+        return 1, file_size;
+
+    if file_size is not None:
+        # the size is known from the listing of server, which supports byte ranges
+        total_size = file_size
+    else:
+        # the size of file is requested first to know how many parts can be downloaded
+        total_size = _file_size(client, URL)
+        if total_size is None:
+            return 1, None;
+
+    return int(max(min(parts, total_size//_MIN_PART_SIZE), 1)), total_size;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _download_to_memory(client, URL, name_file, parts=1, file_size=None, size_format='Decimal', show_download_progress=True, chunk_size=1024*1024, progress_interval=0.5, progress_callback=None, limiter=None, metrics=None):
+
+    '''
+
+    Downloads a file in memory. The parameters are the same of download_file().
+
+    Return
+    ------
+    data : bytes
+        Content of file.
+
+    '''
+
+    if metrics is None:
+        metrics = _file_metrics(URL, name_file)
+
+    parts, total_size = _plan_parts(client, URL, parts, file_size)
+
+    Buffer = bytearray()
+
+    if parts > 1:
+        Progress = _download_progress(name_file, total_size, size_format=size_format, show=show_download_progress, callback=progress_callback, interval=progress_interval)
+        _download_parts(client, URL, Buffer, total_size, parts, Progress, chunk_size=chunk_size, limiter=limiter, metrics=metrics)
+
+    else:
+        req, offset, total_size = _open_file(client, URL, 0)
+        metrics.opened(req)
+        Progress = _download_progress(name_file, total_size, size_format=size_format, show=show_download_progress, callback=progress_callback, interval=progress_interval)
+        attempt = 0
+        while True:
+            try:
+                for chunk in _iter_chunks(req, chunk_size, limiter):
+                    if chunk:
+                        Buffer.extend(chunk)
+                        Progress.set(len(Buffer))
+                        metrics.received(len(chunk))
+            except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError):
+                # the connection was interrupted, the download continues from the bytes already received
+                req.close()
+                if client.controller is not None:
+                    client.controller.failure()
+                metrics.retry()
+                attempt = attempt + 1
+                if attempt > client.retries:
+                    raise
+                req, offset, total_size = _open_file(client, URL, len(Buffer))
+                metrics.opened(req)
+                del Buffer[offset:]
+                Progress.set(len(Buffer))
+            else:
+                req.close()
+                break
+
+        if len(Buffer) != total_size:
+            raise IOError('{} was downloaded incompletely ({} of {} bytes)'.format(name_file, len(Buffer), total_size))
+
+    Progress.finish()
+    metrics.size = total_size
+    metrics.status = 'downloaded'
+
+    return bytes(Buffer);
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def download_file(URL, name_file, path_out, retries=10, backoff=0.2, size_format='Decimal', show_download_progress=True, overwrite_file=False, client=None, parts=1, file_size=None, chunk_size=1024*1024, progress_interval=0.5, progress_callback=None, to_memory=False, max_rate=None, use_cache=True):
+
+    '''
+
+    Save data in file.
+
+    Parameters
+    ----------
+    URL : str
+        Link of file, or key of file in the storage of client (the path of
+        file in the bucket, like noaa-goes16/ABI-L2-CMIPF/2020/140/18/OR_...nc).
+
+    name_file : str 
+        Name of output file.
+
+    path_out : str, optional, default ''
+        Path of folder where file will be saved.
+
+    retries : int, optional, default 10
+        Defines the retries number to connect to server.
+        See: https://urllib3.readthedocs.io/en/latest/reference/urllib3.util.html#module-urllib3.util.retry
+
+    backoff: int, optional, default 0.2
+        A backoff factor to apply between attempts after the second try.
+        See: https://urllib3.readthedocs.io/en/latest/reference/urllib3.util.html#module-urllib3.util.retry
+
+
+    size_format: str, optional, default 'Decimal'
+        Defines how is print the size of file.
+        Options are:
+            'Decimal' : divide file size (in bytes) by (1000*1000) 
+            'Binary' : divide file size (in bytes) by (1024*1024)
+
+    show_download_progress : boolean, optional, default True
+        Parameter to enable and disable the visualization of download progress.
+
+    overwrite_file : boolean, optional, default False
+        Parameter to overwrite or keep a file already downloaded.
+        If overwrite_file=False the downloaded file is keep.
+        If overwrite_file=True the downloaded file is overwrite (the file is
+        downloaded again).
+        The file is first saved as name_file+'.part' and renamed when its
+        download is complete. If the download is interrupted, the '.part'
+        file is kept and the next call continues the download from its
+        current size instead of downloading the file again.
+
+    client : download_client or None, optional, default None
+        Client used to download the file. If client=None a new client is
+        created using retries and backoff, otherwise retries and backoff
+        are taken from the client.
+
+    parts : int, optional, default 1
+        Number of byte ranges of the file downloaded at the same time.
+        If parts>1 the file is split in parts (of at least 8 MB each) that
+        are downloaded using a pool of threads and written directly in their
+        position of the file. It is useful to download large files, like the
+        full disk images of channel 02. The progress shows the bytes
+        received by all the parts. If a part fails, the '.part' file is
+        removed, so the file will be downloaded again from the beginning.
+
+    file_size : int or None, optional, default None
+        Size of file in bytes, when it is already known (for example from the
+        listing of server). If file_size is defined and the file already exists with
+        that size, the file is kept without sending any request to the server.
+
+    chunk_size : int, optional, default 1024*1024
+        Size in bytes of the blocks of data read from the server and written
+        in the file.
+
+    progress_interval : float, optional, default 0.5
+        Minimum time in seconds between two updates of the download progress.
+
+    progress_callback : function or None, optional, default None
+        Function called with the download progress, at most once every
+        progress_interval seconds and when the download finishes, as
+        progress_callback(name_file, size, total_size), where size is the
+        number of bytes already downloaded. It is called even if
+        show_download_progress=False.
+
+    to_memory : boolean, optional, default False
+        If to_memory=True the file is not saved, its content is downloaded
+        in memory and returned as bytes. It can be opened with
+        GOES.open_dataset.from_bytes(data, name_file).
+
+    max_rate : float, rate_limiter or None, optional, default None
+        Maximum rate in bytes per second of the download. The rate limit of
+        client (see download_client) is also applied, so the download never
+        exceeds the rate of client.
+
+    use_cache : boolean, optional, default True
+        If the client has a cache (see download_client), the file is
+        downloaded once in the cache and linked or copied to path_out. If
+        use_cache=False the cache is not used.
+
+
+    Return
+    ------
+    data : bytes or None
+        Content of file if to_memory=True, otherwise None.
+
+    '''
+
+    if client is None:
+        client = download_client(retries=retries, backoff=backoff, pool_size=1)
+
+    limiter = _combine_limiters(client.limiter, _get_limiter(max_rate))
+
+    Metrics = _file_metrics(URL, name_file, client.storage.name)
+    try:
+        data = _download_file(client, URL, name_file, path_out, Metrics, size_format=size_format, show_download_progress=show_download_progress, overwrite_file=overwrite_file, parts=parts, file_size=file_size,
+                              chunk_size=chunk_size, progress_interval=progress_interval, progress_callback=progress_callback, to_memory=to_memory, limiter=limiter, use_cache=use_cache)
+    except Exception as error:
+        if client.metrics is not None:
+            client.metrics.add(Metrics.record(error))
+        raise
+
+    if client.metrics is not None:
+        client.metrics.add(Metrics.record())
+
+    return data;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _download_file(client, URL, name_file, path_out, metrics, size_format='Decimal', show_download_progress=True, overwrite_file=False, parts=1, file_size=None, chunk_size=1024*1024, progress_interval=0.5, progress_callback=None, to_memory=False, limiter=None, use_cache=True):
+
+    '''
+
+    Downloads a file. The parameters are the same of download_file(), and
+    the metrics of download are saved in metrics (_file_metrics).
+
+    '''
+
+    if to_memory == True and (client.cache is None or use_cache == False):
+        return _download_to_memory(client, URL, name_file, parts=parts, file_size=file_size, size_format=size_format, show_download_progress=show_download_progress, chunk_size=chunk_size, progress_interval=progress_interval, progress_callback=progress_callback, limiter=limiter, metrics=metrics);
+
+    FileOut = path_out+name_file
+    FilePart = FileOut+'.part'
+
+    if file_size is not None and overwrite_file==False and to_memory == False:
+        if os.path.isfile(FileOut)==True and os.path.getsize(FileOut)==file_size:
+            print('  {} already exists.'.format(name_file))
+            if os.path.isfile(FilePart)==True:
+                os.remove(FilePart)
+            metrics.size = file_size
+            metrics.status = 'skipped'
+            return
+
+    # ---------- Cache -------------------
+    # the file is downloaded once in the cache of client and then it is linked or copied to path_out
+    if client.cache is not None and use_cache == True:
+        key = client.storage.name+URL if '://' not in URL else URL
+        def fetch_file(folder, name):
+            _download_file(client, URL, name, folder, metrics, size_format=size_format, show_download_progress=show_download_progress, overwrite_file=True, parts=parts, file_size=file_size,
+                           chunk_size=chunk_size, progress_interval=progress_interval, progress_callback=progress_callback, limiter=limiter, use_cache=False)
+        File = client.cache.fetch(key, URL.split('/')[-1], fetch_file, file_size=file_size)
+        metrics.size = os.path.getsize(File)
+
+        if to_memory == True:
+            if metrics.status is None:
+                metrics.status = 'cached'
+            with open(File, 'rb') as cache_file:
+                return cache_file.read();
+
+        if os.path.isfile(FileOut)==True and os.path.getsize(FileOut)==metrics.size and overwrite_file==False:
+            print('  {} already exists.'.format(name_file))
+            if metrics.status is None:
+                metrics.status = 'skipped'
+        else:
+            client.cache.copy_to(File, FileOut)
+            if show_download_progress == True:
+                print('  {} taken from cache.'.format(name_file))
+            if metrics.status is None:
+                metrics.status = 'cached'
+        return
+
+    # only one thread or process of this computer writes the '.part' file at the same time, the others wait and then
+    # continue it or find the file already downloaded
+    with _file_lock(FileOut+'.lock', remove=True):
+        # a partial file left by an interrupted download is resumed from its current size
+        if os.path.isfile(FilePart)==True:
+            offset = os.path.getsize(FilePart)
+        else:
+            offset = 0
+
+        parts, total_size = _plan_parts(client, URL, parts, file_size)
+
+        if parts > 1:
+            req = None
+            offset = 0
+        else:
+            req, offset, total_size = _open_file(client, URL, offset)
+            metrics.opened(req)
+
+        metrics.size = total_size
+        make_download = True
+
+        if os.path.isfile(FileOut)==True:
+            if os.path.getsize(FileOut)==total_size:
+                if overwrite_file==False:
+                    print('  {} already exists.'.format(name_file))
+                    make_download = False
+                else:
+                    print('  {} will be overwritten.'.format(name_file))
+                    make_download = True
+                    metrics.status = 'overwritten'
+            else:
+                make_download = True
+
+
+        if make_download == False:
+            if req is not None:
+                req.close()
+            if os.path.isfile(FilePart)==True:
+                os.remove(FilePart)
+            metrics.status = 'skipped'
+
+        elif parts > 1:
+            Progress = _download_progress(name_file, total_size, size_format=size_format, show=show_download_progress, callback=progress_callback, interval=progress_interval)
+            try:
+                _download_parts(client, URL, FilePart, total_size, parts, Progress, chunk_size=chunk_size, limiter=limiter, metrics=metrics)
+            except Exception:
+                if os.path.isfile(FilePart)==True:
+                    os.remove(FilePart)
+                raise
+
+            Progress.finish()
+            os.replace(FilePart, FileOut)
+            if metrics.status is None:
+                metrics.status = 'downloaded'
+
+        else:
+            size = offset
+            Progress = _download_progress(name_file, total_size, size=offset, size_format=size_format, show=show_download_progress, callback=progress_callback, interval=progress_interval)
+            attempt = 0
+            while True:
+                try:
+                    with open(FilePart,'ab' if offset > 0 else 'wb') as output_file:
+                        for chunk in _iter_chunks(req, chunk_size, limiter):
+                            if chunk:
+                                rec_size = output_file.write(chunk)
+                                size = rec_size + size
+                                Progress.set(size)
+                                metrics.received(rec_size)
+                except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError):
+                    # the connection was interrupted, the download continues from the bytes already saved
+                    req.close()
+                    if client.controller is not None:
+                        client.controller.failure()
+                    metrics.retry()
+                    attempt = attempt + 1
+                    if attempt > client.retries:
+                        raise
+                    req, offset, total_size = _open_file(client, URL, os.path.getsize(FilePart))
+                    metrics.opened(req)
+                    size = offset
+                    Progress.set(size)
+                else:
+                    req.close()
+                    break
+
+            if size != total_size:
+                if size > total_size:
+                    os.remove(FilePart)
+                raise IOError('{} was downloaded incompletely ({} of {} bytes)'.format(name_file, size, total_size))
+
+            Progress.finish()
+            os.replace(FilePart, FileOut)
+            if metrics.status is None:
+                metrics.status = 'downloaded'
+
+    #print('\b')
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _plan_prefixes(Satellite, Product, Product2, ChannelList, scan_mode, DateTimeFolder, DateTimeIni, DateTimeFin):
+
+    '''
+
+    Builds the prefixes of the names of files required from an hour folder,
+    so that only those files are listed. The names of files have the
+    structure OR_<product>-<scan mode>C<channel>_<satellite>_s<start of scan>,
+    for example OR_ABI-L1b-RadC-M6C13_G16_s2020140180, so the prefixes can
+    include the channels and the ten minutes blocks of the start of scan.
+
+    Return
+    ------
+    Prefixes : list
+        Prefixes of the files of folder. [''] means the whole folder.
+
+    Inferred : boolean
+        True if the prefixes were built using a supposed structure of names,
+        so the whole folder must be listed if nothing is found.
+
+    '''
+
+    Sat = 'G'+Satellite[-2:]
+    HourIni = max(DateTimeIni, DateTimeFolder)
+    HourFin = min(DateTimeFin, DateTimeFolder+timedelta(minutes=59, seconds=59))
+
+    if HourIni == DateTimeFolder and HourFin == DateTimeFolder+timedelta(minutes=59, seconds=59):
+        ListTimes = [DateTimeFolder.strftime('%Y%j%H')]
+    else:
+        ListTimes = [DateTimeFolder.strftime('%Y%j%H')+str(tens) for tens in range(HourIni.minute//10, HourFin.minute//10+1)]
+
+    if Product[:4] == 'ABI-':
+        # an hour folder can have files of several scan modes (M3 and M6, or M4 and M6), so if scan_mode=None all of them are listed
+        Inferred = False
+        Modes = ['M3','M4','M6'] if scan_mode is None else [scan_mode]
+        Whole = ['OR_{}-{}'.format(Product2, 'M' if scan_mode is None else scan_mode)]
+        if Product[:-1] in ['ABI-L1b-Rad','ABI-L2-CMIP'] and len(set(ChannelList)) < 16:
+            Names = ['OR_{}-{}C{}_{}_s'.format(Product2, Mode, Channel, Sat) for Mode in Modes for Channel in sorted(set(ChannelList))]
+        else:
+            # other ABI products can include channels in their names, so only the scan mode is used
+            return ['OR_{}-{}'.format(Product2, Mode) for Mode in Modes], Inferred;
+    else:
+        Inferred = True
+        Whole = ['']
+        Names = ['OR_{}_{}_s'.format(Product2, Sat)]
+
+    # too many prefixes are replaced by the prefixes of the hour, or by the prefix of all the files of product
+    Prefixes = [Name+Time for Name in Names for Time in ListTimes]
+    if len(Prefixes) > _MAX_PREFIXES:
+        Prefixes = [Name+DateTimeFolder.strftime('%Y%j%H') for Name in Names]
+    if len(Prefixes) > _MAX_PREFIXES:
+        Prefixes = Whole
+
+    return Prefixes, Inferred;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _list_folders(client, ListPaths, ListClosed, ListPrefixes=None):
+
+    '''
+
+    Lists several folders of server at the same time.
+
+    Parameters
+    ----------
+    client : download_client
+        Client used to list the folders.
+
+    ListPaths : list
+        Folders that will be listed.
+
+    ListClosed : list
+        List of booleans that indicates if each folder will not change anymore.
+
+    ListPrefixes : list or None, optional, default None
+        Prefix of the files listed in each folder. If ListPrefixes=None the
+        whole folders are listed.
+
+    Return
+    ------
+    Listings : list
+        Listing of each folder, in the same order of ListPaths.
+
+    '''
+
+    if ListPrefixes is None:
+        ListPrefixes = ['']*len(ListPaths)
+
+    if len(ListPaths) <= 1 or client.listing_workers <= 1:
+        return [client.ls(path, closed=closed, prefix=prefix) for path, closed, prefix in zip(ListPaths, ListClosed, ListPrefixes)];
+
+    with ThreadPoolExecutor(max_workers=min(client.listing_workers, len(ListPaths))) as executor:
+        Listings = list(executor.map(client.ls, ListPaths, ListClosed, ListPrefixes))
+
+    return Listings;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _download_task(Task, path_out, client, show_download_progress, Options):
+
+    '''
+
+    Downloads one of the files selected by _plan_download().
+
+    '''
+
+    # the controller of client limits the number of files downloaded at the same time, and a failed file waits its turn
+    # in the controller to be downloaded again
+    if client.controller is None:
+        data = download_file(Task['key'], Task['name'], path_out, show_download_progress=show_download_progress, client=client, file_size=Task['size'], **Options)
+    else:
+        attempt = 0
+        while True:
+            client.controller.acquire()
+            try:
+                data = download_file(Task['key'], Task['name'], path_out, show_download_progress=show_download_progress, client=client, file_size=Task['size'], **Options)
+            except IOError:
+                client.controller.release(ok=False)
+                attempt = attempt + 1
+                if attempt > client.controller.task_retries:
+                    raise
+            except Exception:
+                client.controller.release(ok=False)
+                raise
+            else:
+                client.controller.release(ok=True)
+                break
+
+    if Options.get('to_memory', False) == True:
+        return open_dataset.from_bytes(data, Task['name']);
+
+    return path_out+Task['name'];
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _download_tasks(ListTasks, path_out, client, workers=1, show_download_progress=True, Options={}):
+
+    '''
+
+    Downloads a list of files, one by one or using a pool of threads.
+
+    Parameters
+    ----------
+    ListTasks : list
+        List of files selected by _plan_download().
+
+    path_out : str
+        Path of folder where files will be saved.
+
+    client : download_client
+        Client shared by all the downloads.
+
+    workers : int, optional, default 1
+        Number of files downloaded at the same time.
+
+    show_download_progress : boolean, optional, default True
+        Parameter to enable and disable the visualization of download progress.
+
+    Options : dict, optional, default {}
+        Other parameters of download_file().
+
+
+    Return
+    ------
+    Downloaded_files : list
+        List with the downloaded files (path+filename), or with the datasets
+        if Options['to_memory']=True, in the same order of ListTasks. The
+        files that could not be downloaded are not included.
+
+    '''
+
+    Results = [None]*len(ListTasks)
+
+    if workers > 1:
+        # the progress of several files can not be shown in the same line
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_download_task, Task, path_out, client, False, Options): idx for idx, Task in enumerate(ListTasks)}
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    Results[idx] = future.result()
+                except Exception as error:
+                    print('  {} failed: {}'.format(ListTasks[idx]['name'], error))
+                else:
+                    if show_download_progress == True:
+                        print('  {} done'.format(ListTasks[idx]['name']))
+    else:
+        for idx, Task in enumerate(ListTasks):
+            try:
+                Results[idx] = _download_task(Task, path_out, client, show_download_progress, Options)
+            except Exception as error:
+                print('  {} failed: {}'.format(Task['name'], error))
+
+    Downloaded_files = [Result for Result in Results if Result is not None]
+
+    return Downloaded_files;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class download_journal():
+
+    '''
+
+    Journal of downloads saved in a SQLite file. It keeps the files planned
+    by each request of download() and their state (planned, running, done
+    or failed), so a run that was interrupted continues with the files not
+    downloaded yet without listing the server again, and several processes
+    of the same computer can download the files of the same request at the
+    same time. The journal must be saved in a local disk, SQLite (in WAL
+    mode) does not work in network folders.
+
+    Parameters
+    ----------
+    path : str
+        SQLite file of journal. It is created if it does not exist.
+
+    lease : float, optional, default 600
+        Time in seconds after which a file that is still running is
+        considered abandoned (its process died) and can be downloaded by
+        other process. The lease of a file is renewed while it is
+        downloaded, so it can take longer than lease. The files of dead
+        processes of the same computer are recovered immediately.
+
+    max_attempts : int, optional, default 3
+        Number of times that a file is tried before it is marked as failed.
+
+    Example
+    -------
+        journal = GOES.download_journal('/data/goes/backfill.sqlite')
+        GOES.download('goes16', 'ABI-L2-CMIPF', DateTimeIni='20200101-000000', DateTimeFin='20200331-235959', channel=['13'], path_out='/data/goes/', workers=8, journal=journal)
+        print(journal.stats())
+
+    '''
+
+    def __init__(self, path, lease=600, max_attempts=3):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        with self.lock:
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('CREATE TABLE IF NOT EXISTS jobs (job TEXT PRIMARY KEY, description TEXT, planned REAL)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS files (job TEXT, key TEXT, name TEXT, size INTEGER, state TEXT, owner TEXT, '
+                            'updated REAL, attempts INTEGER DEFAULT 0, error TEXT, PRIMARY KEY (job, key))')
+            self.db.execute('CREATE INDEX IF NOT EXISTS files_state ON files (job, state)')
+
+
+    def is_planned(self, job):
+        with self.lock:
+            return self.db.execute('SELECT 1 FROM jobs WHERE job=?', (job,)).fetchone() is not None;
+
+
+    def plan(self, job, ListTasks, description=''):
+        # the files and the job are saved in one transaction, so a job is planned only if all its files are saved
+        with self.lock:
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                self.db.executemany("INSERT OR IGNORE INTO files (job, key, name, size, state, updated) VALUES (?, ?, ?, ?, 'planned', ?)",
+                                    [(job, Task['key'], Task['name'], Task['size'], time.time()) for Task in ListTasks])
+                self.db.execute('INSERT OR REPLACE INTO jobs (job, description, planned) VALUES (?, ?, ?)', (job, description, time.time()))
+            except Exception:
+                self.db.execute('ROLLBACK')
+                raise
+            self.db.execute('COMMIT')
+
+
+    def claim(self, job, owner):
+
+        '''
+
+        Takes a planned file (or a running file whose lease expired) of job
+        and marks it as running by owner. Returns a task dict with the key,
+        name and size of file, or None if there are no more files.
+
+        '''
+
+        with self.lock:
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.db.execute("SELECT key, name, size FROM files WHERE job=? AND (state='planned' OR (state='running' AND updated<?)) ORDER BY name LIMIT 1",
+                                      (job, time.time()-self.lease)).fetchone()
+                if row is not None:
+                    self.db.execute("UPDATE files SET state='running', owner=?, updated=? WHERE job=? AND key=?", (owner, time.time(), job, row[0]))
+            except Exception:
+                self.db.execute('ROLLBACK')
+                raise
+            self.db.execute('COMMIT')
+        if row is None:
+            return None
+        return {'key':row[0], 'name':row[1], 'size':row[2]};
+
+
+    def renew(self, job, key, owner):
+
+        '''
+
+        Renews the lease of a running file of owner. Returns False if the
+        file is not running by owner anymore.
+
+        '''
+
+        with self.lock:
+            cursor = self.db.execute("UPDATE files SET updated=? WHERE job=? AND key=? AND state='running' AND owner=?", (time.time(), job, key, owner))
+        return cursor.rowcount > 0;
+
+
+    def complete(self, job, key):
+        with self.lock:
+            self.db.execute("UPDATE files SET state='done', updated=?, error=NULL WHERE job=? AND key=?", (time.time(), job, key))
+
+
+    def fail(self, job, key, error=''):
+        # the file is planned again until it fails max_attempts times
+        with self.lock:
+            self.db.execute("UPDATE files SET attempts=attempts+1, updated=?, error=?, state=CASE WHEN attempts+1>=? THEN 'failed' ELSE 'planned' END WHERE job=? AND key=?",
+                            (time.time(), str(error), self.max_attempts, job, key))
+
+
+    def recover(self, job):
+
+        '''
+
+        Plans again the running files of job whose owner is a process of
+        this computer that does not exist anymore, and the failed files, so
+        they are tried again by the new run.
+
+        '''
+
+        host = socket.gethostname()
+        with self.lock:
+            Owners = [row[0] for row in self.db.execute("SELECT DISTINCT owner FROM files WHERE job=? AND state='running'", (job,))]
+        for owner in Owners:
+            owner_host, _, owner_pid = (owner or '').rpartition(':')[0].rpartition(':')
+            if owner_host == host and owner_pid.isdigit() and _process_exists(int(owner_pid)) == False:
+                with self.lock:
+                    self.db.execute("UPDATE files SET state='planned' WHERE job=? AND state='running' AND owner=?", (job, owner))
+        with self.lock:
+            self.db.execute("UPDATE files SET state='planned', attempts=0 WHERE job=? AND state='failed'", (job,))
+
+
+    def files(self, job, state='done'):
+        with self.lock:
+            return [{'key':row[0], 'name':row[1], 'size':row[2]} for row in self.db.execute('SELECT key, name, size FROM files WHERE job=? AND state=? ORDER BY name', (job, state))];
+
+
+    def stats(self, job=None):
+
+        '''
+
+        Returns the number of files of each state, of a job or of the
+        whole journal.
+
+        '''
+
+        with self.lock:
+            if job is None:
+                rows = self.db.execute('SELECT state, COUNT(*) FROM files GROUP BY state').fetchall()
+            else:
+                rows = self.db.execute('SELECT state, COUNT(*) FROM files WHERE job=? GROUP BY state', (job,)).fetchall()
+        stats = {'planned':0, 'running':0, 'done':0, 'failed':0}
+        stats.update(dict(rows))
+        return stats;
+
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _process_exists(pid):
+
+    '''
+
+    Returns True if a process with the identifier pid exists in this computer.
+
+    '''
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _journal_job(Query, rename_fmt, path_out):
+
+    '''
+
+    Returns the identifier of a request of download() in the journal and
+    its description.
+
+    '''
+
+    description = json.dumps([Query['Satellite'], Query['Product2'], sorted(set(Query['ChannelList'])), Query['DateTimeIni'].strftime('%Y%m%d-%H%M%S'),
+                              Query['DateTimeFin'].strftime('%Y%m%d-%H%M%S'), Query['scan_mode'], rename_fmt, path_out])
+    return hashlib.md5(description.encode('utf-8')).hexdigest(), description;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+class _lease_renewer():
+
+    '''
+
+    Progress callback that renews the lease of a file of download_journal
+    every lease/3 seconds, and calls the progress_callback of user.
+
+    '''
+
+    def __init__(self, journal, job, key, owner, callback=None):
+        self.journal = journal
+        self.job = job
+        self.key = key
+        self.owner = owner
+        self.callback = callback
+        self.interval = journal.lease/3.0
+        self.last_time = time.time()
+        self.lock = threading.Lock()
+
+
+    def __call__(self, name_file, size, total_size):
+        now = time.time()
+        with self.lock:
+            renew = now-self.last_time >= self.interval
+            if renew == True:
+                self.last_time = now
+        if renew == True:
+            self.journal.renew(self.job, self.key, self.owner)
+        if self.callback is not None:
+            self.callback(name_file, size, total_size)
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _download_journal_tasks(journal, job, path_out, client, workers=1, show_download_progress=True, Options={}):
+
+    '''
+
+    Downloads the files of a job of journal. Each worker takes the next
+    planned file from the journal until there are no more files, so several
+    processes can download the same job at the same time.
+
+    Return
+    ------
+    Downloaded_files : list
+        All the files of job already downloaded (path+filename), including
+        those downloaded by other processes or previous runs.
+
+    '''
+
+    journal.recover(job)
+    # the owner includes the computer, process and thread, the process is used to recover the files of dead processes
+    base_owner = '{}:{}'.format(socket.gethostname(), os.getpid())
+
+    def worker(show):
+        owner = '{}:{}'.format(base_owner, threading.get_ident())
+        while True:
+            Task = journal.claim(job, owner)
+            if Task is None:
+                break
+            # the lease of file is renewed from the progress of download, so other processes do not take it
+            TaskOptions = dict(Options, progress_callback=_lease_renewer(journal, job, Task['key'], owner, Options.get('progress_callback')))
+            try:
+                _download_task(Task, path_out, client, show, TaskOptions)
+            except Exception as error:
+                print('  {} failed: {}'.format(Task['name'], error))
+                journal.fail(job, Task['key'], error)
+            else:
+                journal.complete(job, Task['key'])
+                if show == False and show_download_progress == True:
+                    print('  {} done'.format(Task['name']))
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(worker, False) for idx in range(workers)]
+            for future in futures:
+                future.result()
+    else:
+        worker(show_download_progress)
+
+    return [path_out+Task['name'] for Task in journal.files(job, 'done')];
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _build_query(Satellite, Product, DateTimeIni=None, DateTimeFin=None, domain=None, channel=None, scan_mode=None):
+
+    '''
+
+    Checks the parameters of a request of data and joins them in a dict.
+    The parameters are the same of download().
+
+    Return
+    ------
+    Query : dict or None
+        Parameters of request. It is None if some parameter is not valid.
+
+    '''
+
+    # ---------- Satellite -------------------
+    try:
+        assert Satellite == 'goes16' or Satellite == 'goes17' or Satellite == 'goes18' or Satellite == 'goes19'
+    except AssertionError:
+        print('\nSatellite should be goes16, goes17, goes18 or goes19\n')
+        return
+    else:
+        if Satellite == 'goes16':
+            Sat = 'G16'
+        elif Satellite == 'goes17':
+            Sat = 'G17'
+        elif Satellite == 'goes18':
+            Sat = 'G18'
+        elif Satellite == 'goes19':
+            Sat = 'G19'
+
+    # ---------- Product and Domain -------------------
+    if Product[-1] == 'M':
+        try:
+            assert domain == 'M1' or domain == 'M2'
+        except AssertionError:
+            print("\nProduct domain is mesoscale so you need define domain='M1' or domain='M2'\n")
+            return
+        else:
+            if domain == 'M1':
+                Product2 = Product+'1'
+            elif domain == 'M2':
+                Product2 = Product+'2'
+    else:
+        Product2 = Product
+
+    # ---------- DateTimeIni -------------------
+    try:
+        assert DateTimeIni != None
+    except AssertionError:
+        print('\nYou must define initial DateTimeIni\n')
+        return
+    else:
+        DateTimeIni = datetime.strptime(DateTimeIni, '%Y%m%d-%H%M%S')
+
+    # ---------- DateTimeFin -------------------
+    if DateTimeFin == None :
+        DateTimeFin = DateTimeIni
+    else:
+        DateTimeFin = datetime.strptime(DateTimeFin, '%Y%m%d-%H%M%S')
+
+    # ---------- channel -------------------
+
+    if Product[:-1] in ['ABI-L1b-Rad','ABI-L2-CMIP']:
+
+        try:
+            assert channel != None
+        except AssertionError:
+            print('\nYou must define channel or channels\n')
+            return
+        else:
+
+            try:
+                assert isinstance(channel, list) == True
+            except AssertionError:
+                print('\nChannel must be a list\n')
+                return
+            else:
+                ChannelList = []
+                for item in channel:
+
+                    try:
+                        assert isinstance(item, str) == True
+                    except AssertionError:
+                        print('\nEach elements of channel must have string format\n')
+                        return
+                    else:
+
+                        try:
+                            assert len(item) == 2 or len(item) == 5
+                        except AssertionError:
+                            print('\nElement of channel must be string with two or five characters\n')
+                            return
+                        else:
+                            if len(item) == 2 :
+                                ChannelList.append(item)
+                            elif len(item) == 5 :
+                                ChIni, ChEnd = item.split('-')
+                                for Chn in range(int(ChIni),int(ChEnd)+1):
+                                    ChannelList.append('{:02d}'.format(Chn))
+
+                #if download_info == 'minimal' or download_info == 'full':
+                #    print('channel list: {}'.format(ChannelList))
+
+    if Product[:-1] not in ['ABI-L1b-Rad','ABI-L2-CMIP']:
+        ChannelList = []
+
+    Query = {'Satellite':Satellite, 'Product':Product, 'Product2':Product2, 'ChannelList':ChannelList,
+             'DateTimeIni':DateTimeIni, 'DateTimeFin':DateTimeFin, 'scan_mode':scan_mode}
+
+    return Query;
+
 #-----------------------------------------------------------------------------------------------------------------------------------
-def show_products():
+def _build_queries(specs, DateTimeIni=None, DateTimeFin=None):
 
     '''
 
-    Lists the products available from GOES-16, GOES-17, GOES-18, GOES-19.
+    Checks a list of specs of download_batch() and builds their requests
+    with _build_query().
+
+    Return
+    ------
+    Queries : list or None
+        List of requests. It is None if some spec is not valid.
 
     '''
 
-    Satellite = ['goes16','goes17','goes18','goes19']
-    print(' ')
-    for sat in Satellite:
-        print('Products for '+sat+':')
-        fs = s3fs.S3FileSystem(anon=True)
-        for item in fs.ls('s3://noaa-'+sat+'/'):
-            if item.split('/')[-1] == 'index.html':
-                print(' ')
-            else:
-                print('\t'+item.split('/')[-1])
+    Queries = []
+    for spec in specs:
+        if isinstance(spec, dict):
+            Spec = spec
+        else:
+            Spec = dict(zip(['Satellite','Product','domain','channel'], spec))
+        Query = _build_query(Spec['Satellite'], Spec['Product'], DateTimeIni=DateTimeIni, DateTimeFin=DateTimeFin, domain=Spec.get('domain'), channel=Spec.get('channel'), scan_mode=Spec.get('scan_mode'))
+        if Query is None:
+            return
+        Queries.append(Query)
 
-    print('Descriptions of each product is shown in https://docs.opendata.aws/noaa-goes16/cics-readme.html#about-the-data \n')
+    return Queries;
 
 #-----------------------------------------------------------------------------------------------------------------------------------
-def download_file(URL, name_file, path_out, retries=10, backoff=0.2, size_format='Decimal', show_download_progress=True, overwrite_file=False):
+def _plan_download(client, Queries, rename_fmt=False):
 
     '''
 
-    Save data in file.
+    Lists the hour folders of several requests at the same time and selects
+    the files required by each one.
 
     Parameters
     ----------
-    URL : str
-        Link of file.
+    client : download_client
+        Client used to list the folders.
+
+    Queries : list
+        List of requests made by _build_query().
+
+    rename_fmt : boolean or str, optional, default False
+        See download().
+
+    Return
+    ------
+    ListTasks : list
+        List of dicts with the key (path of file in the storage), output name
+        and size of the files that will be downloaded.
+
+    '''
+
+    # ---------- Listing -------------------
+    # the hour folders are listed at the same time, a folder is closed when its hour ended more than one hour ago
+    # and only the files whose name starts with the prefixes planned for each folder are listed
+    DateTimeNow = datetime.now(timezone.utc).replace(tzinfo=None)
+    ListFolders = []
+    ListPaths = []
+    ListClosed = []
+    ListPrefixes = []
+    for Query in Queries:
+        server = client.storage.bucket(Query['Satellite'])+'/'+Query['Product']+'/'
+        DateTimeIniLoop = Query['DateTimeIni'].replace(minute=0, second=0, microsecond=0)
+        DateTimeFinLoop = Query['DateTimeFin'].replace(minute=0, second=0, microsecond=0)+timedelta(minutes=60)
+        while DateTimeIniLoop < DateTimeFinLoop :
+            Prefixes, Inferred = _plan_prefixes(Query['Satellite'], Query['Product'], Query['Product2'], Query['ChannelList'], Query['scan_mode'], DateTimeIniLoop, Query['DateTimeIni'], Query['DateTimeFin'])
+            ListFolders.append((Query, server+DateTimeIniLoop.strftime('%Y/%j/%H/'), DateTimeIniLoop+timedelta(minutes=120) < DateTimeNow, Inferred, len(Prefixes)))
+            for Prefix in Prefixes:
+                ListPaths.append(server+DateTimeIniLoop.strftime('%Y/%j/%H/'))
+                ListClosed.append(DateTimeIniLoop+timedelta(minutes=120) < DateTimeNow)
+                ListPrefixes.append(Prefix)
+            DateTimeIniLoop = DateTimeIniLoop + timedelta(minutes=60)
+
+    ListingsPrefixes = _list_folders(client, ListPaths, ListClosed, ListPrefixes)
+
+    # ---------- Loop -------------------
+    ListTasks = []
+    idx = 0
+    for Query, path, closed, Inferred, NPrefixes in ListFolders:
+
+        # the listings of folder are joined, and the folders with supposed prefixes without files are listed complete
+        ListFiles = [item for Listing in ListingsPrefixes[idx:idx+NPrefixes] for item in Listing]
+        if len(ListFiles) == 0 and Inferred == True and ListPrefixes[idx] != '':
+            ListFiles = client.ls(path, closed=closed)
+        idx = idx + NPrefixes
+
+        ListTasks.extend(_select_files(Query, ListFiles, rename_fmt))
+
+    return ListTasks;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _select_files(Query, ListFiles, rename_fmt=False):
+
+    '''
+
+    Selects the files of a listing required by a request made by
+    _build_query().
+
+    Return
+    ------
+    ListTasks : list
+        List of dicts with the key (path of file in the storage), output name
+        and size of the selected files.
+
+    '''
+
+    Product = Query['Product']
+    Product2 = Query['Product2']
+    ChannelList = Query['ChannelList']
+    DateTimeIni = Query['DateTimeIni']
+    DateTimeFin = Query['DateTimeFin']
+
+    if len(ListFiles) == 0:
+        return [];
+
+    # the names are parsed at once and the files are selected comparing arrays
+    Index = parse_filenames([item['name'] for item in ListFiles])
+    DateTimeFile = Index['start'].astype('datetime64[s]')
+
+    Mask = (np.char.find(Index['name'], Product2) >= 0) & (DateTimeFile >= np.datetime64(DateTimeIni)) & (DateTimeFile <= np.datetime64(DateTimeFin))
+    if Product[:-1] in ['ABI-L1b-Rad','ABI-L2-CMIP']:
+        Mask = Mask & np.isin(Index['channel'], ChannelList)
+
+    # the listing includes the size of files, used to keep the files already downloaded
+    ListTasks = []
+    for idx in np.flatnonzero(Mask):
+        NameFile = str(Index['name'][idx])
+        if rename_fmt == False:
+            NameOut = NameFile
+        else:
+            NameOut = NameFile[:NameFile.find('_s')+2] + DateTimeFile[idx].astype(datetime).strftime(rename_fmt) + '.nc'
+        ListTasks.append({'key':ListFiles[idx]['name'], 'name':NameOut, 'size':ListFiles[idx]['size']})
+
+    return ListTasks;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def download(Satellite, Product, DateTimeIni=None, DateTimeFin=None, domain=None, channel=None, rename_fmt=False, path_out='', retries=10, backoff=10, size_format='Decimal', show_download_progress=True, overwrite_file=False, workers=1, client=None, parts=1, chunk_size=1024*1024, progress_interval=0.5, progress_callback=None, scan_mode=None, to_memory=False, max_rate=None, journal=None):
+
+    '''
+
+    Download data of GOES-16, GOES-17, GOES-18 and GOES-19 from Amazon server
+    (or from the storage of client, see download_client).
+    This function is based on the code of
+    blaylockbk https://gist.github.com/blaylockbk/d60f4fce15a7f0475f975fc57da9104d
+
+
+    Parameters
+    ----------
+    Satellite : str
+        Indicates serie of GOES, the options are 'goes16', 'goes17', 'goes18' and 'goes19'
+
+
+    Product : str
+        Indicates the instrument and level of product. The products
+        can be list using: GOES.show_products()
+
+
+    DateTimeIni : str
+        String that indicates the initial datetime. Its structure
+        must be yyyymmdd-HHMMSS
+        Example:
+            DateTimeIni='20180520-183000'
+
+
+    DateTimeFin : str
+        String that indicates the final datetime. Its structure
+        must be yyyymmdd-HHMMSS
+        Example:
+            DateTimeFin='20180520-183000'
+
+
+    domain : str
+        This parameter just is necessary with Mesoescale products.
+        The options are:
+            M1 : Mesoscale 1
+            M2 : Mesoscale 2
+
+
+    channel : list
+        This parameter just is necessary with ABI-L1b-Rad and ABI-L2-CMIP products.
+        List indicates the channel or channels that will be download.
+        The channels can be mentioned individually as elements of the list
+        or as a sequence of channels separated by a hyphen ('-').
+        Example:
+            channel = ['02','08','09','10','11','13']
+            channel = ['02','08-11','13']
+
+
+    rename_fmt : boolean or str, optional, default False
+        Is an optional parameter and its default value is rename_fmt=False which
+        indicates that the file name is kept. If would you like that the file name
+        just keep the start time of scan you have to define the format of datetime.
+        See the next link to know about datetime format:
+        https://docs.python.org/3/library/datetime.html#strftime-and-strptime-format-codes).
+        Example:
+            rename_fmt = '%Y%m%d%H%M%S'
+            rename_fmt = '%Y%m%d%H%M'
+            rename_fmt = '%Y%j%H%M'
 
-    name_file : str 
-        Name of output file.
 
     path_out : str, optional, default ''
-        Path of folder where file will be saved.
+        Optional string that indicates the folder where data will be download.
+        The default value is folder where python was open.
 
-    retries : int, optional, default 10
+
+    retries: int, optional, default 10
         Defines the retries number to connect to server.
         See: https://urllib3.readthedocs.io/en/latest/reference/urllib3.util.html#module-urllib3.util.retry
 
-    backoff: int, optional, default 0.2
+    backoff: int, optional, default 10
         A backoff factor to apply between attempts after the second try.
         See: https://urllib3.readthedocs.io/en/latest/reference/urllib3.util.html#module-urllib3.util.retry
 
 
     size_format: str, optional, default 'Decimal'
-        Defines how is print the size of file.
+        It defines how is print the size of file.
         Options are:
             'Decimal' : divide file size (in bytes) by (1000*1000) 
             'Binary' : divide file size (in bytes) by (1024*1024)
@@ -82,302 +2805,703 @@ def download_file(URL, name_file, path_out, retries=10, backoff=0.2, size_format
         If overwrite_file=True the downloaded file is overwrite (the file is
         downloaded again).
 
-    '''
+    workers : int, optional, default 1
+        Number of files downloaded at the same time. If workers>1 the files
+        are downloaded using a pool of threads and, to avoid mixing the lines
+        of several files, only one line is printed for each file when its
+        download finishes. Files that could not be downloaded are reported
+        and are not included in the returned list.
+
+    client : download_client or None, optional, default None
+        Client used to list and download the files. The same client can be
+        used in several calls to reuse its connections. If client=None a new
+        client of Amazon Web Services is created using retries, backoff and a
+        pool of connections large enough for the workers.
+
+    parts : int, optional, default 1
+        Number of byte ranges of each file downloaded at the same time.
+        See download_file().
+
+    chunk_size : int, optional, default 1024*1024
+        Size in bytes of the blocks of data read from the server and written
+        in the files.
+
+    progress_interval : float, optional, default 0.5
+        Minimum time in seconds between two updates of the download progress
+        of a file.
+
+    progress_callback : function or None, optional, default None
+        Function called with the download progress of each file as
+        progress_callback(name_file, size, total_size). See download_file().
+
+    scan_mode : str or None, optional, default None
+        Scan mode of ABI products ('M3', 'M4' or 'M6'). It is used, with the
+        channels and the start of scan, to list only the required files of
+        each hour folder. If scan_mode=None the files of all the scan modes
+        (M3, M4 and M6) are listed.
+
+    to_memory : boolean, optional, default False
+        If to_memory=True the files are not saved in path_out, they are
+        downloaded in memory and opened directly, so the list returned
+        contains open_dataset objects instead of names of files.
+
+    max_rate : float, rate_limiter or None, optional, default None
+        Maximum rate in bytes per second shared by all the files downloaded
+        at the same time. The rate limit of client (see download_client) is
+        also applied.
+
+    journal : str, download_journal or None, optional, default None
+        SQLite file (or download_journal) where the files planned for the
+        request and their state are saved. If the run is interrupted, the
+        next call with the same parameters continues with the files not
+        downloaded yet, without listing the server again, and several
+        processes can make the same call at the same time to share the
+        files. The planned files are not updated, so it should be used with
+        past dates. It is not used if to_memory=True.
+
+
+    Return
+    ------
+    Download_files : list
+        List with the downloaded files (path+filename), or with the datasets
+        (open_dataset) of the files if to_memory=True. If journal is used,
+        the list includes all the files of request already downloaded.
+
+    '''
+
+    if client is None:
+        client = download_client(retries=retries, backoff=backoff, pool_size=max(workers*parts,10))
+
+    Query = _build_query(Satellite, Product, DateTimeIni=DateTimeIni, DateTimeFin=DateTimeFin, domain=domain, channel=channel, scan_mode=scan_mode)
+    if Query is None:
+        return
+
+    Options = {'retries':retries, 'backoff':backoff, 'size_format':size_format, 'overwrite_file':overwrite_file, 'parts':parts,
+               'chunk_size':chunk_size, 'progress_interval':progress_interval, 'progress_callback':progress_callback, 'to_memory':to_memory,
+               'max_rate':_get_limiter(max_rate)}
+
+    # ---------- Journal -------------------
+    # the files are planned only once, the next runs and other processes take the files from the journal
+    if journal is not None and to_memory == False:
+        if isinstance(journal, str):
+            journal = download_journal(journal)
+        job, description = _journal_job(Query, rename_fmt, path_out)
+        if journal.is_planned(job) == False:
+            journal.plan(job, _plan_download(client, [Query], rename_fmt=rename_fmt), description)
+        if show_download_progress == True:
+            print('Files:')
+        return _download_journal_tasks(journal, job, path_out, client, workers=workers, show_download_progress=show_download_progress, Options=Options);
+
+    ListTasks = _plan_download(client, [Query], rename_fmt=rename_fmt)
+    ListTasks.sort(key=lambda Task: Task['name'])
+
+    if show_download_progress == True:
+        print('Files:')
+
+    # ---------- Download -------------------
+    Downloaded_files = _download_tasks(ListTasks, path_out, client, workers=workers, show_download_progress=show_download_progress, Options=Options)
+
+    return Downloaded_files;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def iter_download(Satellite, Product, DateTimeIni=None, DateTimeFin=None, domain=None, channel=None, rename_fmt=False, path_out='', retries=10, backoff=10, size_format='Decimal', show_download_progress=True, overwrite_file=False, prefetch=2, client=None, parts=1, chunk_size=1024*1024, progress_interval=0.5, progress_callback=None, scan_mode=None, max_rate=None):
+
+    '''
+
+    Download data of GOES-16, GOES-17, GOES-18 and GOES-19 from Amazon server,
+    returning each file as soon as its download is complete. While a file is
+    processed, the next files are downloaded in the background, so the
+    processing and the downloads are made at the same time.
+
+    Parameters
+    ----------
+    prefetch : int, optional, default 2
+        Number of files downloaded in the background, ahead of the file
+        that is being processed.
+
+    The other parameters are the same of download().
+
+
+    Yield
+    -----
+    File : str
+        Downloaded file (path+filename). The files are returned in the same
+        order of the list returned by download(). The files that could not be
+        downloaded are reported and skipped.
+
+    Example
+    -------
+        for File in GOES.iter_download('goes16', 'ABI-L2-CMIPF', DateTimeIni='20200520-000000', DateTimeFin='20200520-060000', channel=['13'], prefetch=4):
+            ds = GOES.open_dataset(File)
+            CMI, LonCen, LatCen = ds.image('CMI', domain=[-90.0,-60.0,-20.0,10.0])
+
+    '''
+
+    prefetch = max(prefetch, 1)
+
+    if client is None:
+        client = download_client(retries=retries, backoff=backoff, pool_size=max(prefetch*parts,10))
+
+    Query = _build_query(Satellite, Product, DateTimeIni=DateTimeIni, DateTimeFin=DateTimeFin, domain=domain, channel=channel, scan_mode=scan_mode)
+    if Query is None:
+        return
+
+    ListTasks = _plan_download(client, [Query], rename_fmt=rename_fmt)
+    ListTasks.sort(key=lambda Task: Task['name'])
+
+    if show_download_progress == True:
+        print('Files:')
+
+    # ---------- Download -------------------
+    # the progress of several files can not be shown in the same line, so only one line is printed for each file
+    Options = {'retries':retries, 'backoff':backoff, 'size_format':size_format, 'overwrite_file':overwrite_file, 'parts':parts,
+               'chunk_size':chunk_size, 'progress_interval':progress_interval, 'progress_callback':progress_callback,
+               'max_rate':_get_limiter(max_rate)}
+    executor = ThreadPoolExecutor(max_workers=prefetch)
+    futures = deque()
+    idx = 0
+    try:
+        while idx < len(ListTasks) or len(futures) > 0:
+
+            # keeps prefetch files downloading
+            while idx < len(ListTasks) and len(futures) < prefetch:
+                futures.append((ListTasks[idx], executor.submit(_download_task, ListTasks[idx], path_out, client, False, Options)))
+                idx = idx + 1
+
+            Task, future = futures.popleft()
+            try:
+                FileOut = future.result()
+            except Exception as error:
+                print('  {} failed: {}'.format(Task['name'], error))
+            else:
+                if show_download_progress == True:
+                    print('  {} done'.format(Task['name']))
+                yield FileOut
+
+    finally:
+        # if the loop is stopped, the files not started are cancelled
+        for Task, future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def download_batch(specs, DateTimeIni=None, DateTimeFin=None, rename_fmt=False, path_out='', retries=10, backoff=10, size_format='Decimal', show_download_progress=True, overwrite_file=False, workers=1, client=None, parts=1, chunk_size=1024*1024, progress_interval=0.5, progress_callback=None, to_memory=False, max_rate=None):
+
+    '''
+
+    Download data of several satellites and products of GOES-16, GOES-17,
+    GOES-18 and GOES-19 in one call. The hour folders of all the products
+    are listed at the same time and all the files are downloaded with the
+    same pool of workers and connections.
+
+    Parameters
+    ----------
+    specs : list
+        List of the products that will be downloaded. Each element can be a
+        tuple (Satellite, Product, domain, channel), where domain and channel
+        are optional, or a dict with the keys 'Satellite', 'Product' and
+        optionally 'domain', 'channel' and 'scan_mode'. See download().
+        Example:
+            specs = [('goes16', 'ABI-L2-CMIPF', None, ['13']),
+                     ('goes18', 'ABI-L2-CMIPF', None, ['13']),
+                     ('goes16', 'ABI-L2-ACHAF'),
+                     ('goes16', 'GLM-L2-LCFA')]
+
+    The other parameters are the same of download() and are applied to all
+    the products.
+
+
+    Return
+    ------
+    Download_files : list
+        List with the downloaded files (path+filename) of all the products,
+        or with the datasets (open_dataset) of the files if to_memory=True.
+
+    Example
+    -------
+        GOES.download_batch(specs, DateTimeIni='20200520-180000', DateTimeFin='20200520-190000', path_out='/data/', workers=16)
 
-    StartTime = datetime.now()
+    '''
 
-    retries_config = Retry(total=retries, backoff_factor=backoff, status_forcelist=[500, 502, 503, 504])
+    if client is None:
+        client = download_client(retries=retries, backoff=backoff, pool_size=max(workers*parts,10))
 
-    session = requests.Session()
-    session.mount('http://', HTTPAdapter(max_retries=retries_config))
-    session.mount('https://', HTTPAdapter(max_retries=retries_config))
-    req = session.get(URL, stream=True)
-    #req = requests.get(URL, stream=True)
-    total_size = int(req.headers['content-length'])
-    size = 0
-    if size_format == 'Binary':
-        dsize = 1024*1024
-    else:
-        dsize = 1000*1000
+    Queries = _build_queries(specs, DateTimeIni, DateTimeFin)
+    if Queries is None:
+        return
 
+    ListTasks = _plan_download(client, Queries, rename_fmt=rename_fmt)
+    # the same file can be required by two specs
+    ListTasks = list({Task['key']:Task for Task in ListTasks}.values())
+    ListTasks.sort(key=lambda Task: Task['name'])
 
-    make_download = True
+    if show_download_progress == True:
+        print('Files:')
 
-    if os.path.isfile(path_out+name_file)==True:
-        if os.path.getsize(path_out+name_file)==total_size:
-            if overwrite_file==False:
-                print('  {} already exists.'.format(name_file))
-                make_download = False
-            else:
-                print('  {} will be overwritten.'.format(name_file))
-                make_download = True
-        else:
-            make_download = True
-
-
-    if make_download == True:
-        with open(path_out+name_file,'wb') as output_file:
-            for chunk in req.iter_content(chunk_size=1024):
-                if chunk:
-                    rec_size = output_file.write(chunk)
-                    size = rec_size + size
-                    if show_download_progress==True:
-                        print('  {} {:3.0f}% {:.1f}MB {}'.format(name_file,100.0*size/total_size, size/dsize, '{}m{}s'.format(round((datetime.now()-StartTime).seconds/60.0),(datetime.now()-StartTime).seconds%60) if (datetime.now()-StartTime).seconds>60 else '{}s'.format((datetime.now()-StartTime).seconds) ), end="\r") #, flush=True)
-                        #print('\t{}\t{:3.0f}%\t{:.2f} min'.format(name_file,100.0*size/total_size, (datetime.now()-StartTime).seconds/60.0), end="\r") #, flush=True)
-                        if size == total_size:
-                            #print('\n')
-                            print('  {} {:3.0f}% {:.1f}MB {}'.format(name_file,100.0*size/total_size, size/dsize, '{}m{}s'.format(round((datetime.now()-StartTime).seconds/60.0),(datetime.now()-StartTime).seconds%60) if (datetime.now()-StartTime).seconds>60 else '{}s'.format((datetime.now()-StartTime).seconds) ))
+    # ---------- Download -------------------
+    Options = {'retries':retries, 'backoff':backoff, 'size_format':size_format, 'overwrite_file':overwrite_file, 'parts':parts,
+               'chunk_size':chunk_size, 'progress_interval':progress_interval, 'progress_callback':progress_callback, 'to_memory':to_memory,
+               'max_rate':_get_limiter(max_rate)}
+    Downloaded_files = _download_tasks(ListTasks, path_out, client, workers=workers, show_download_progress=show_download_progress, Options=Options)
 
-    #print('\b')
+    return Downloaded_files;
 
 #-----------------------------------------------------------------------------------------------------------------------------------
-def download(Satellite, Product, DateTimeIni=None, DateTimeFin=None, domain=None, channel=None, rename_fmt=False, path_out='', retries=10, backoff=10, size_format='Decimal', show_download_progress=True, overwrite_file=False):
+def inventory(specs, DateTimeIni=None, DateTimeFin=None, client=None):
 
     '''
 
-    Download data of GOES-16, GOES-17, GOES-18 and GOES-19 from Amazon server.
-    This function is based on the code of
-    blaylockbk https://gist.github.com/blaylockbk/d60f4fce15a7f0475f975fc57da9104d
-
+    Builds the inventory of the data available of several products for
+    each hour, without downloading the files. The hour folders are listed
+    at the same time and the listings are saved in the client, like in
+    download(). It is useful to know the size of a download and to find the
+    hours without data.
 
     Parameters
     ----------
-    Satellite : str
-        Indicates serie of GOES, the options are 'goes16', 'goes17', 'goes18' and 'goes19'
-
-
-    Product : str
-        Indicates the instrument and level of product. The products
-        can be list using: GOES.show_products()
-
+    specs : list
+        List of the products, like in download_batch(). Each element can be
+        a tuple (Satellite, Product, domain, channel) or a dict.
 
     DateTimeIni : str
-        String that indicates the initial datetime. Its structure
-        must be yyyymmdd-HHMMSS
-        Example:
-            DateTimeIni='20180520-183000'
-
+        String that indicates the initial datetime (yyyymmdd-HHMMSS).
 
     DateTimeFin : str
-        String that indicates the final datetime. Its structure
-        must be yyyymmdd-HHMMSS
-        Example:
-            DateTimeFin='20180520-183000'
+        String that indicates the final datetime (yyyymmdd-HHMMSS).
+
+    client : download_client or None, optional, default None
+        Client used to list the folders. If client=None a new client is
+        created.
+
+    Returns
+    -------
+    Inventory : ndarray
+        Structured array with one row for each product, channel and hour
+        (the hours without files are included), with the fields:
+            satellite : satellite, like 'goes16'
+            product : product, like 'ABI-L2-CMIPF' or 'ABI-L2-CMIPM1'
+            channel : channel of ABI-L1b-Rad and ABI-L2-CMIP products, or ''
+                      for the other products (the files of all their
+                      channels are counted)
+            hour : hour of the start of scan (datetime64[h])
+            files : number of files
+            bytes : size of files in bytes
+
+    Example
+    -------
+        Inventory = GOES.inventory([('goes16', 'ABI-L2-CMIPF', None, ['13'])], DateTimeIni='20200501-000000', DateTimeFin='20200531-235959')
+        print(Inventory[Inventory['files'] == 0])
+        print(Inventory['bytes'].sum()/1e9, 'GB')
 
+    '''
 
-    domain : str
-        This parameter just is necessary with Mesoescale products.
-        The options are:
-            M1 : Mesoscale 1
-            M2 : Mesoscale 2
+    if client is None:
+        client = download_client()
 
+    Queries = _build_queries(specs, DateTimeIni, DateTimeFin)
+    if Queries is None:
+        return
 
-    channel : list
-        This parameter just is necessary with ABI-L1b-Rad and ABI-L2-CMIP products.
-        List indicates the channel or channels that will be download.
-        The channels can be mentioned individually as elements of the list
-        or as a sequence of channels separated by a hyphen ('-').
-        Example:
-            channel = ['02','08','09','10','11','13']
-            channel = ['02','08-11','13']
+    ListTasks = _plan_download(client, Queries)
+    Index = parse_filenames([Task['key'] for Task in ListTasks])
+    Sizes = np.array([Task['size'] for Task in ListTasks], dtype=np.int64)
+    Hours = Index['start'].astype('datetime64[h]')
+
+    # one row for each product, channel and hour, so the hours without files are included
+    Rows = []
+    for Query in Queries:
+        Hour = np.arange(np.datetime64(Query['DateTimeIni'], 'h'), np.datetime64(Query['DateTimeFin'], 'h')+1)
+        Sat = 'G'+Query['Satellite'][-2:]
+        for Channel in sorted(set(Query['ChannelList'])) or ['']:
+            Row = (Index['platform'] == Sat) & (Index['product'] == Query['Product2'])
+            # the other products (like ABI-L2-DMWF) can include channels in their names, all of them are counted in the row ''
+            if Channel != '':
+                Row = Row & (Index['channel'] == Channel)
+            Position = np.searchsorted(Hour, Hours[Row])
+            Rows.append((Query['Satellite'], Query['Product2'], Channel, Hour,
+                         np.bincount(Position, minlength=Hour.size), np.bincount(Position, weights=Sizes[Row], minlength=Hour.size).astype(np.int64)))
+
+    Inventory = np.zeros(sum([Row[3].size for Row in Rows]), dtype=[('satellite','U6'), ('product','U32'), ('channel','U2'), ('hour','datetime64[h]'), ('files',np.int64), ('bytes',np.int64)])
+    idx = 0
+    for Satellite, Product2, Channel, Hour, Files, Bytes in Rows:
+        Inventory['satellite'][idx:idx+Hour.size] = Satellite
+        Inventory['product'][idx:idx+Hour.size] = Product2
+        Inventory['channel'][idx:idx+Hour.size] = Channel
+        Inventory['hour'][idx:idx+Hour.size] = Hour
+        Inventory['files'][idx:idx+Hour.size] = Files
+        Inventory['bytes'][idx:idx+Hour.size] = Bytes
+        idx = idx + Hour.size
+
+    return Inventory;
 
+#-----------------------------------------------------------------------------------------------------------------------------------
+def follow(Satellite, Product, DateTimeIni=None, DateTimeFin=None, domain=None, channel=None, rename_fmt=False, path_out='', retries=10, backoff=10, size_format='Decimal', show_download_progress=True, overwrite_file=False, workers=4, client=None, parts=1, chunk_size=1024*1024, progress_interval=0.5, progress_callback=None, scan_mode=None, to_memory=False, max_rate=None, poll_interval=20):
 
-    rename_fmt : boolean or str, optional, default False
-        Is an optional parameter and its default value is rename_fmt=False which
-        indicates that the file name is kept. If would you like that the file name
-        just keep the start time of scan you have to define the format of datetime.
-        See the next link to know about datetime format:
-        https://docs.python.org/3/library/datetime.html#strftime-and-strptime-format-codes).
-        Example:
-            rename_fmt = '%Y%m%d%H%M%S'
-            rename_fmt = '%Y%m%d%H%M'
-            rename_fmt = '%Y%j%H%M'
+    '''
 
+    Follows the data of GOES-16, GOES-17, GOES-18 and GOES-19 in real time,
+    returning each new file as soon as it is published and downloaded.
+    The server is checked every poll_interval seconds. The last file seen
+    of each stream of files (scan mode and channel) of an hour folder is
+    kept, so each check only lists the files of the stream published after
+    it (start-after), and the new files are downloaded at the same time
+    using a pool of workers.
 
-    path_out : str, optional, default ''
-        Optional string that indicates the folder where data will be download.
-        The default value is folder where python was open.
+    Parameters
+    ----------
+    DateTimeIni : str or None, optional, default None
+        String that indicates the initial datetime (yyyymmdd-HHMMSS) of
+        the files. The files published before the call, since DateTimeIni,
+        are downloaded in the first check. If DateTimeIni=None only the
+        files whose scan starts after the call are returned.
 
+    DateTimeFin : str or None, optional, default None
+        String that indicates the final datetime (yyyymmdd-HHMMSS). The
+        function ends when the files until DateTimeFin were downloaded
+        (15 minutes after DateTimeFin). If DateTimeFin=None it never ends.
 
-    retries: int, optional, default 10
-        Defines the retries number to connect to server.
-        See: https://urllib3.readthedocs.io/en/latest/reference/urllib3.util.html#module-urllib3.util.retry
+    workers : int, optional, default 4
+        Number of files downloaded at the same time.
 
-    backoff: int, optional, default 10
-        A backoff factor to apply between attempts after the second try.
-        See: https://urllib3.readthedocs.io/en/latest/reference/urllib3.util.html#module-urllib3.util.retry
+    poll_interval : float, optional, default 20
+        Time in seconds between two checks of the server. A file is returned
+        at most poll_interval seconds (plus its download) after it is
+        published.
 
+    The other parameters are the same of download().
 
-    size_format: str, optional, default 'Decimal'
-        It defines how is print the size of file.
-        Options are:
-            'Decimal' : divide file size (in bytes) by (1000*1000) 
-            'Binary' : divide file size (in bytes) by (1024*1024)
 
-    show_download_progress : boolean, optional, default True
-        Parameter to enable and disable the visualization of download progress.
+    Yield
+    -----
+    File : str or open_dataset
+        Downloaded file (path+filename), or its dataset if to_memory=True,
+        in the order that their downloads finish. The files that could not be
+        downloaded are tried again in the next check, up to three times.
 
-    overwrite_file : boolean, optional, default False
-        Parameter to overwrite or keep a file already downloaded.
-        If overwrite_file=False the downloaded file is keep.
-        If overwrite_file=True the downloaded file is overwrite (the file is
-        downloaded again).
+    Example
+    -------
+        for File in GOES.follow('goes16', 'ABI-L2-CMIPC', channel=['13'], path_out='/data/', poll_interval=15):
+            ds = GOES.open_dataset(File)
 
+    '''
 
-    Return
-    ------
-    Download_files : list
-        List with the downloaded files (path+filename).
+    if client is None:
+        client = download_client(retries=retries, backoff=backoff, pool_size=max(workers*parts,10))
 
-    '''
+    DateTimeNow = datetime.now(timezone.utc).replace(tzinfo=None)
+    if DateTimeIni is None:
+        DateTimeIni = DateTimeNow.strftime('%Y%m%d-%H%M%S')
 
-    # ---------- Satellite -------------------
-    try:
-        assert Satellite == 'goes16' or Satellite == 'goes17' or Satellite == 'goes18' or Satellite == 'goes19'
-    except AssertionError:
-        print('\nSatellite should be goes16, goes17, goes18 or goes19\n')
+    Query = _build_query(Satellite, Product, DateTimeIni=DateTimeIni, DateTimeFin=DateTimeFin, domain=domain, channel=channel, scan_mode=scan_mode)
+    if Query is None:
         return
-    else:
-        if Satellite == 'goes16':
-            Sat = 'G16'
-        elif Satellite == 'goes17':
-            Sat = 'G17'
-        elif Satellite == 'goes18':
-            Sat = 'G18'
-        elif Satellite == 'goes19':
-            Sat = 'G19'
+    if DateTimeFin is None:
+        Query['DateTimeFin'] = datetime.max
 
-    # ---------- Product and Domain -------------------
-    if Product[-1] == 'M':
-        try:
-            assert domain == 'M1' or domain == 'M2'
-        except AssertionError:
-            print("\nProduct domain is mesoscale so you need define domain='M1' or domain='M2'\n")
-            return
-        else:
-            if domain == 'M1':
-                Product2 = Product+'1'
-            elif domain == 'M2':
-                Product2 = Product+'2'
-    else:
-        Product2 = Product
+    if show_download_progress == True:
+        print('Files:')
 
-    # ---------- DateTimeIni -------------------
+    Options = {'retries':retries, 'backoff':backoff, 'size_format':size_format, 'overwrite_file':overwrite_file, 'parts':parts,
+               'chunk_size':chunk_size, 'progress_interval':progress_interval, 'progress_callback':progress_callback, 'to_memory':to_memory,
+               'max_rate':_get_limiter(max_rate)}
+
+    Streams = {}
+    First = True
+    Retries = []
+    futures = {}
+    executor = ThreadPoolExecutor(max_workers=workers)
     try:
-        assert DateTimeIni != None
-    except AssertionError:
-        print('\nYou must define initial DateTimeIni\n')
-        return
-    else:
-        DateTimeIni = datetime.strptime(DateTimeIni, '%Y%m%d-%H%M%S')
+        while True:
+            PollTime = time.time()
+            DateTimeNow = datetime.now(timezone.utc).replace(tzinfo=None)
+            # the files of a scan are published some minutes after its start
+            Ended = Query['DateTimeFin'] != datetime.max and DateTimeNow > Query['DateTimeFin']+timedelta(minutes=15)
+
+            # ---------- Listing -------------------
+            # the first check lists the hour folders since DateTimeIni, the next ones the current and previous hour folders.
+            # Each folder is listed with its planned prefixes, so the new streams (scan modes or channels) are found. The
+            # names of files of a stream (product, scan mode and channel) are sorted by the start of scan, so a prefix of
+            # only one stream is listed from its last file seen (start-after).
+            ListFolders = []
+            if First == True:
+                HourFolder = Query['DateTimeIni'].replace(minute=0, second=0, microsecond=0)
+            else:
+                HourFolder = max(DateTimeNow-timedelta(minutes=60), Query['DateTimeIni']).replace(minute=0, second=0, microsecond=0)
+            First = False
+            while HourFolder <= min(DateTimeNow, Query['DateTimeFin']):
+                path = client.storage.bucket(Satellite)+'/'+Product+'/'+HourFolder.strftime('%Y/%j/%H/')
+                Prefixes, Inferred = _plan_prefixes(Satellite, Product, Query['Product2'], Query['ChannelList'], Query['scan_mode'], HourFolder, HourFolder, HourFolder+timedelta(minutes=59, seconds=59))
+                if Inferred == True:
+                    Prefixes = ['OR_'+Query['Product2']]
+                for Prefix in Prefixes:
+                    # the prefixes with the start of scan (_s) have only one stream
+                    Stream = Prefix[:Prefix.find('_s')+2] if '_s' in Prefix else None
+                    ListFolders.append((path, Prefix, Streams.get(path, {}).get(Stream)))
+                HourFolder = HourFolder + timedelta(minutes=60)
+
+            Streams = {path:Streams[path] for path in set([Folder[0] for Folder in ListFolders]) if path in Streams}
+
+            def list_folder(Folder):
+                # a failed listing is repeated in the next check from the same file
+                start = time.time()
+                try:
+                    ListFiles = client.storage.ls(client, Folder[0], prefix=Folder[1], start_after=Folder[2] or '')
+                except Exception as error:
+                    print('  listing of {} failed: {}'.format(Folder[0]+Folder[1], error))
+                    return None;
+                if client.metrics is not None:
+                    client.metrics.add({'type':'listing', 'path':Folder[0]+Folder[1], 'time':time.time()-start, 'files':len(ListFiles), 'cached':False})
+                return ListFiles;
+
+            if len(ListFolders) > 0:
+                with ThreadPoolExecutor(max_workers=min(client.listing_workers, len(ListFolders))) as list_executor:
+                    Listings = list(list_executor.map(list_folder, ListFolders))
+            else:
+                Listings = []
+
+            ListTasks = []
+            for (path, Prefix, LastKey), ListFiles in zip(ListFolders, Listings):
+                if ListFiles is None or len(ListFiles) == 0:
+                    continue
+                Folder = Streams.setdefault(path, {})
+                LastSeen = dict(Folder)
+                NewFiles = []
+                for item in ListFiles:
+                    NameFile = item['name'].split('/')[-1]
+                    Stream = NameFile[:NameFile.find('_s')+2]
+                    # only the streams of the product and channels required are followed, and the files already seen are skipped
+                    if Query['Product2'] in Stream and (len(Query['ChannelList']) == 0 or Stream.split('_')[1][-2:] in Query['ChannelList']):
+                        if item['name'] > LastSeen.get(Stream, ''):
+                            Folder[Stream] = max(Folder.get(Stream, ''), item['name'])
+                            NewFiles.append(item)
+                ListTasks.extend(_select_files(Query, NewFiles, rename_fmt))
+
+            # ---------- Download -------------------
+            ListTasks.sort(key=lambda Task: Task['name'])
+            for Task in Retries+ListTasks:
+                futures[executor.submit(_download_task, Task, path_out, client, False, Options)] = Task
+            Retries = []
+
+            # the downloaded files are returned while the next check is awaited
+            while True:
+                remaining = poll_interval-(time.time()-PollTime)
+                if len(futures) == 0:
+                    if remaining > 0 and Ended == False:
+                        time.sleep(remaining)
+                    break
+                if remaining <= 0 and Ended == False:
+                    break
+                done, pending = wait(list(futures), timeout=None if Ended else remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    Task = futures.pop(future)
+                    try:
+                        FileOut = future.result()
+                    except Exception as error:
+                        print('  {} failed: {}'.format(Task['name'], error))
+                        Task['attempts'] = Task.get('attempts', 0) + 1
+                        if Task['attempts'] < 3:
+                            Retries.append(Task)
+                    else:
+                        if show_download_progress == True:
+                            print('  {} done'.format(Task['name']))
+                        yield FileOut
 
-    # ---------- DateTimeFin -------------------
-    if DateTimeFin == None :
-        DateTimeFin = DateTimeIni
-    else:
-        DateTimeFin = datetime.strptime(DateTimeFin, '%Y%m%d-%H%M%S')
+            if Ended == True and len(futures) == 0 and len(Retries) == 0:
+                break
 
-    # ---------- channel -------------------
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
 
-    if Product[:-1] in ['ABI-L1b-Rad','ABI-L2-CMIP']:
+#-----------------------------------------------------------------------------------------------------------------------------------
+def sync(specs, path_out, DateTimeIni=None, DateTimeFin=None, lookback=3, interval=300, cycles=None, workers=8, parts=1, retries=10, backoff=10, max_rate=None, client=None, report=None, show_download_progress=False):
 
-        try:
-            assert channel != None
-        except AssertionError:
-            print('\nYou must define channel or channels\n')
-            return
-        else:
+    '''
 
-            try:
-                assert isinstance(channel, list) == True
-            except AssertionError:
-                print('\nChannel must be a list\n')
-                return
-            else:
-                ChannelList = []
-                for item in channel:
+    Keeps a local archive of GOES data in sync with the server. The files
+    are saved with the same structure of the buckets
+    (path_out/noaa-goes16/ABI-L2-CMIPF/YYYY/DDD/HH/OR_...nc), and the server
+    is checked every interval seconds. In each check (cycle) only the hour
+    folders of the last lookback hours are listed (the listings of past
+    hours are saved in path_out/.goes-sync/listings and never requested
+    again), the files that are not in the archive are downloaded at the
+    same time and the interrupted downloads continue from their '.part'
+    files. A report of each cycle is printed (and saved in report).
 
-                    try:
-                        assert isinstance(item, str) == True
-                    except AssertionError:
-                        print('\nEach elements of channel must have string format\n')
-                        return
-                    else:
+    Parameters
+    ----------
+    specs : list
+        Products that are synchronized, see download_batch().
 
-                        try:
-                            assert len(item) == 2 or len(item) == 5
-                        except AssertionError:
-                            print('\nElement of channel must be string with two or five characters\n')
-                            return
-                        else:
-                            if len(item) == 2 :
-                                ChannelList.append(item)
-                            elif len(item) == 5 :
-                                ChIni, ChEnd = item.split('-')
-                                for Chn in range(int(ChIni),int(ChEnd)+1):
-                                    ChannelList.append('{:02d}'.format(Chn))
+    path_out : str
+        Folder of archive.
 
-                #if download_info == 'minimal' or download_info == 'full':
-                #    print('channel list: {}'.format(ChannelList))
+    DateTimeIni : str or None, optional, default None
+        Initial datetime (yyyymmdd-HHMMSS) of archive. The first cycle
+        downloads the files since DateTimeIni (backfill), the next cycles
+        check only the last lookback hours. If DateTimeIni=None the archive
+        starts lookback hours before the call.
 
+    DateTimeFin : str or None, optional, default None
+        Final datetime (yyyymmdd-HHMMSS) of archive. The synchronization ends
+        when all the files until DateTimeFin were downloaded (15 minutes
+        after DateTimeFin). If DateTimeFin=None it never ends.
 
-    #"""
-    Downloaded_files = []
+    lookback : float, optional, default 3
+        Number of hours checked in each cycle.
 
-    if show_download_progress == True:
-        print('Files:')
+    interval : float, optional, default 300
+        Time in seconds between the start of two cycles.
 
-    # ---------- Loop -------------------
-    DateTimeIniLoop = DateTimeIni.replace(minute=0)
-    DateTimeFinLoop = DateTimeFin.replace(minute=0)+timedelta(minutes=60)
-    while DateTimeIniLoop < DateTimeFinLoop :
+    cycles : int or None, optional, default None
+        Maximum number of cycles. If cycles=1 the archive is synchronized
+        once. If cycles=None the cycles continue until DateTimeFin.
 
-        DateTimeFolder = DateTimeIniLoop.strftime('%Y/%j/%H/')
+    workers : int, optional, default 8
+        Number of files downloaded at the same time.
 
-        server = 's3://noaa-'+Satellite+'/'+Product+'/'
-        fs = s3fs.S3FileSystem(anon=True)
-        ListFiles = np.array(fs.ls(server+DateTimeFolder))
+    report : str or None, optional, default None
+        File where the report of each cycle is appended as a line of JSON.
 
-        for line in ListFiles:
-            if Product[:-1] in ['ABI-L1b-Rad','ABI-L2-CMIP']:
-                NameFile = line.split('/')[-1]
-                ChannelFile = NameFile.split('_')[1][-2:]
-                DateTimeFile = datetime.strptime(NameFile[NameFile.find('_s')+2:NameFile.find('_e')-1], '%Y%j%H%M%S')
+    client : download_client or None, optional, default None
+        Client used to list and download the files. It should not be used
+        by other functions during the synchronization. If client=None, a
+        client that saves its listings in path_out/.goes-sync/listings is
+        created.
 
-                if Product2 in NameFile    and    ChannelFile in ChannelList    and    DateTimeIni <= DateTimeFile <= DateTimeFin:
+    The other parameters are the same of download().
 
-                    if rename_fmt == False:
-                        NameOut = NameFile
-                    else:
-                        NameOut = NameFile[:NameFile.find('_s')+2] + DateTimeFile.strftime(rename_fmt) + '.nc'
 
-                    #print(ChannelFile, DateTimeFile, NameOut)
-                    download_file('https://noaa-'+Satellite+'.s3.amazonaws.com'+line[len('noaa-'+Satellite):], NameOut, path_out, retries=retries, backoff=backoff, size_format=size_format, show_download_progress=show_download_progress, overwrite_file=overwrite_file)
-                    Downloaded_files.append(path_out+NameOut)
+    Return
+    ------
+    Reports : list
+        List of dicts with the report of each cycle: the window of time
+        checked, the number of files listed, already in archive,
+        downloaded and failed, the error that stopped the cycle (for
+        example a failed listing, None if there was no error) and the
+        metrics of downloads (see download_metrics.summary()). An error
+        does not stop the synchronization, the next cycle checks the same
+        files again.
+
+    Example
+    -------
+        specs = [('goes16', 'ABI-L2-CMIPF', None, ['13']), ('goes16', 'GLM-L2-LCFA')]
+        GOES.sync(specs, '/data/archive/', DateTimeIni='20200520-000000', workers=16)
 
-            else:
-                NameFile = line.split('/')[-1]
-                DateTimeFile = datetime.strptime(NameFile[NameFile.find('_s')+2:NameFile.find('_e')-1], '%Y%j%H%M%S')
+    '''
 
-                if Product2 in NameFile    and    DateTimeIni <= DateTimeFile <= DateTimeFin:
+    if client is None:
+        client = download_client(retries=retries, backoff=backoff, pool_size=max(workers*parts,10), listing_cache=os.path.join(path_out, '.goes-sync', 'listings'))
 
-                    if rename_fmt == False:
-                        NameOut = NameFile
-                    else:
-                        NameOut = NameFile[:NameFile.find('_s')+2] + DateTimeFile.strftime(rename_fmt) + '.nc'
+    DateTimeNow = datetime.now(timezone.utc).replace(tzinfo=None)
+    if DateTimeIni is None:
+        DateTimeIni = (DateTimeNow-timedelta(hours=lookback)).strftime('%Y%m%d-%H%M%S')
 
-                    #print(DateTimeFile, NameOut)
-                    download_file('https://noaa-'+Satellite+'.s3.amazonaws.com'+line[len('noaa-'+Satellite):], NameOut, path_out, retries=retries, backoff=backoff, size_format=size_format, show_download_progress=show_download_progress, overwrite_file=overwrite_file)
-                    Downloaded_files.append(path_out+NameOut)
+    Queries = _build_queries(specs, DateTimeIni, DateTimeFin)
+    if Queries is None:
+        return
+    ArchiveIni = Queries[0]['DateTimeIni']
+    ArchiveFin = datetime.max if DateTimeFin is None else Queries[0]['DateTimeFin']
+
+    Options = {'retries':retries, 'backoff':backoff, 'parts':parts, 'max_rate':_get_limiter(max_rate)}
+
+    Reports = []
+    Failed = {}
+    cycle = 0
+    PendingIni = ArchiveIni
+    UserMetrics = client.metrics
+    while True:
+        CycleTime = time.time()
+        DateTimeNow = datetime.now(timezone.utc).replace(tzinfo=None)
+        # the files of a scan are published some minutes after its start
+        Ended = ArchiveFin != datetime.max and DateTimeNow > ArchiveFin+timedelta(minutes=15)
+
+        # the first cycle covers the whole archive, the next ones only the last hours (or the window of a cycle with error)
+        WindowIni = max(ArchiveIni, DateTimeNow-timedelta(hours=lookback))
+        if PendingIni is not None:
+            WindowIni = min(WindowIni, PendingIni)
+        WindowFin = min(ArchiveFin, DateTimeNow)
+
+        Metrics = download_metrics(callback=None if UserMetrics is None else UserMetrics.add)
+        client.metrics = Metrics
+        NListed = 0
+        NArchived = 0
+        ListTasks = []
+        Error = None
+        try:
+            # ---------- Listing -------------------
+            if WindowIni <= WindowFin:
+                ListTasks = _plan_download(client, [dict(Query, DateTimeIni=WindowIni, DateTimeFin=WindowFin) for Query in Queries])
+            NListed = len(ListTasks)
+            # the files that failed in the previous cycles are tried again even if they are out of window
+            Tasks = dict(Failed)
+            Tasks.update({Task['key']:Task for Task in ListTasks})
+
+            # ---------- Archive -------------------
+            # the files are saved with their key, so the archive has the structure of the bucket
+            ListTasks = []
+            for key, Task in sorted(Tasks.items()):
+                FileOut = os.path.join(path_out, key)
+                if os.path.isfile(FileOut) == True and os.path.getsize(FileOut) == Task['size']:
+                    continue
+                os.makedirs(os.path.dirname(FileOut), exist_ok=True)
+                ListTasks.append({'key':key, 'name':key, 'size':Task['size']})
+            NArchived = len(Tasks)-len(ListTasks)
+
+            # ---------- Download -------------------
+            Downloaded_files = _download_tasks(ListTasks, os.path.join(path_out, ''), client, workers=workers, show_download_progress=show_download_progress, Options=Options)
+            Downloaded_files = set(Downloaded_files)
+            Failed = {Task['key']:Task for Task in ListTasks if os.path.join(path_out, '')+Task['name'] not in Downloaded_files}
+            PendingIni = None
+        except Exception as error:
+            # an error of the server or of the network stops only this cycle, the failed files are tried again in the next one
+            Error = '{}: {}'.format(type(error).__name__, error)
+            ListTasks = []
+            PendingIni = WindowIni
+        finally:
+            client.metrics = UserMetrics
+
+        Report = {'cycle':cycle+1, 'time':DateTimeNow.strftime('%Y-%m-%d %H:%M:%S'),
+                  'window':[WindowIni.strftime('%Y%m%d-%H%M%S'), WindowFin.strftime('%Y%m%d-%H%M%S')],
+                  'listed':NListed, 'archived':NArchived, 'downloaded':max(len(ListTasks)-len(Failed), 0), 'failed':len(Failed),
+                  'error':Error, 'metrics':Metrics.summary()}
+        Reports.append(Report)
+        _print_sync_report(Report)
+        if report is not None:
+            with open(report, 'a') as report_file:
+                report_file.write(json.dumps(Report)+'\n')
+
+        cycle = cycle + 1
+        if cycles is not None and cycle >= cycles:
+            break
+        # the archive is complete when its end was checked without failures, the failed cycles are tried three more times
+        if Ended == True and ((len(Failed) == 0 and Error is None) or (len(Reports) >= 3 and all([item['failed'] > 0 or item['error'] is not None for item in Reports[-3:]]))):
+            break
+
+        time.sleep(max(interval-(time.time()-CycleTime), 0))
+
+    return Reports;
 
-        DateTimeIniLoop = DateTimeIniLoop + timedelta(minutes=60)
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _print_sync_report(Report):
 
-    Downloaded_files.sort()
+    '''
 
-    return Downloaded_files;
+    Prints the report of a cycle of sync().
+
+    '''
+
+    Summary = Report['metrics']
+    print('Cycle {} ({} UTC), window {} to {}'.format(Report['cycle'], Report['time'], Report['window'][0], Report['window'][1]))
+    print('  listed: {}, in archive: {}, downloaded: {}, failed: {}'.format(Report['listed'], Report['archived'], Report['downloaded'], Report['failed']))
+    if Report['error'] is not None:
+        print('  error: {}'.format(Report['error']))
+    print('  {:.1f} MB received in {:.1f}s ({:.2f} MB/s), {:.1f}s listing, {} retries'.format(Summary['bytes']/1e6, Summary['wall_time'], Summary['throughput']/1e6,
+                                                                                         Summary['listing_time'], Summary['retries']))
 
 #-----------------------------------------------------------------------------------------------------------------------------------
-def show_products_from_google_cloud(Satellite):
+def show_products_from_google_cloud(Satellite, client=None):
 
     '''
 
@@ -388,36 +3512,28 @@ def show_products_from_google_cloud(Satellite):
     Satellite : str
         Indicates serie of GOES, the options are 'goes16', 'goes17', 'goes18' and 'goes19'
 
-    '''
+    client : download_client or None, optional, default None
+        Client used to list the products. If client=None a new client of the
+        Google Cloud storage is created.
 
-    if 'COLAB_GPU' in os.environ:
+    '''
 
-        if Satellite == 'goes16':
-            Sat = '16'
-        elif Satellite == 'goes17':
-            Sat = '17'
-        elif Satellite == 'goes18':
-            Sat = '18'
-        elif Satellite == 'goes19':
-            Sat = '19'
-        server = 'gs://gcp-public-data-goes-{}/'.format(Sat)
-        #list_gc = !gsutil ls -d $server
-        list_gc = subprocess.run(['gsutil','ls','-d',server], capture_output=True, text=True).stdout
-        list_gc = list(list_gc.split('\n'))[:-1]
-        print('Products of {} available in Google Cloud:'.format(Satellite))
-        for folder in list_gc:
-            if folder[-1] == '/':
-                print('  {}'.format(folder[len(server):-1]))
+    if client is None:
+        client = download_client(storage='gcs')
 
-    else:
-        print('\n  This function only works in Colab\n')
+    print('Products of {} available in Google Cloud:'.format(Satellite))
+    for folder in client.storage.products(client, Satellite):
+        print('  {}'.format(folder))
 
 #-----------------------------------------------------------------------------------------------------------------------------------
-def get_data_to_colab(Satellite, Product, DateTimeIni=None, DateTimeFin=None, domain=None, channel=None, path_out='/content/', size_format='Decimal'):
+def get_data_to_colab(Satellite, Product, DateTimeIni=None, DateTimeFin=None, domain=None, channel=None, path_out='/content/', size_format='Decimal', show_download_progress=True, overwrite_file=False, workers=1, client=None):
 
     '''
 
     Copy data of GOES-16, GOES-17, GOES-18 and GOES-19 from the Google Cloud to colab folder.
+    The files are listed with the JSON API of Google Cloud Storage and
+    downloaded using HTTPS with the same engine of download(), so gsutil is
+    not required and the function also works outside of colab.
 
     Parameters
     ----------
@@ -427,7 +3543,7 @@ def get_data_to_colab(Satellite, Product, DateTimeIni=None, DateTimeFin=None, do
 
     Product : str
         Indicates the instrument and level of product. The products
-        can be list using: GOES.show_products()
+        can be list using: GOES.show_products_from_google_cloud()
 
 
     DateTimeIni : str
@@ -463,7 +3579,6 @@ def get_data_to_colab(Satellite, Product, DateTimeIni=None, DateTimeFin=None, do
 
     path_out : str, optional, default '/content/'
         Optional string that indicates the folder where data will be download.
-        The default value is folder where python was open.
 
 
     size_format: str, optional, default 'Decimal'
@@ -472,6 +3587,13 @@ def get_data_to_colab(Satellite, Product, DateTimeIni=None, DateTimeFin=None, do
             'Decimal' : divide file size (in bytes) by (1000*1000) 
             'Binary' : divide file size (in bytes) by (1024*1024)
 
+    show_download_progress, overwrite_file, workers : optional
+        See download().
+
+    client : download_client or None, optional, default None
+        Client used to list and download the files. If client=None a new
+        client of the Google Cloud storage is created.
+
 
     Return
     ------
@@ -480,188 +3602,11 @@ def get_data_to_colab(Satellite, Product, DateTimeIni=None, DateTimeFin=None, do
 
     '''
 
-    if 'COLAB_GPU' in os.environ:
-
-        # ----------------------------------------
-        if size_format == 'Binary':
-            dsize = 1024*1024
-        else:
-            dsize = 1000*1000
-
-        # ---------- Satellite -------------------
-        try:
-            assert Satellite == 'goes16' or Satellite == 'goes17' or Satellite == 'goes18' or Satellite == 'goes19'
-        except AssertionError:
-            print('\nSatellite should be goes16, goes17, goes18 or goes19\n')
-            return
-        else:
-            if Satellite == 'goes16':
-                Sat = '16'
-            elif Satellite == 'goes17':
-                Sat = '17'
-            elif Satellite == 'goes18':
-                Sat = '18'
-            elif Satellite == 'goes19':
-                Sat = '19'
-
-        # ---------- Product and Domain -------------------
-        if Product[-1] == 'M':
-            try:
-                assert domain == 'M1' or domain == 'M2'
-            except AssertionError:
-                print("\nProduct domain is mesoscale so you need define domain='M1' or domain='M2'\n")
-                return
-            else:
-                if domain == 'M1':
-                    Product2 = Product+'1'
-                elif domain == 'M2':
-                    Product2 = Product+'2'
-        else:
-            Product2 = Product
-
-        # ---------- DateTimeIni -------------------
-        try:
-            assert DateTimeIni != None
-        except AssertionError:
-            print('\nYou must define initial DateTimeIni\n')
-            return
-        else:
-            DateTimeIni = datetime.strptime(DateTimeIni, '%Y%m%d-%H%M%S')
-
-        # ---------- DateTimeFin -------------------
-        if DateTimeFin == None :
-            DateTimeFin = DateTimeIni
-        else:
-            DateTimeFin = datetime.strptime(DateTimeFin, '%Y%m%d-%H%M%S')
-
-        # ---------- channel -------------------
-
-        if Product[:-1] in ['ABI-L1b-Rad','ABI-L2-CMIP']:
-
-            try:
-                assert channel != None
-            except AssertionError:
-                print('\nYou must define channel or channels\n')
-                return
-            else:
-
-                try:
-                    #assert isinstance(channel, list) == True
-                    assert isinstance(channel, type([])) == True
-                except AssertionError:
-                    print('\nChannel must be a list\n')
-                    return
-                else:
-                    ChannelList = []
-                    for item in channel:
-
-                        try:
-                            #assert isinstance(item, str) == True
-                            assert isinstance(item, type('Hola Joao')) == True
-                        except AssertionError:
-                            print('\nEach elements of channel must have string format\n')
-                            return
-                        else:
-
-                            try:
-                                assert len(item) == 2 or len(item) == 5
-                            except AssertionError:
-                                print('\nElement of channel must be string with two or five characters\n')
-                                return
-                            else:
-                                if len(item) == 2 :
-                                    ChannelList.append(item)
-                                elif len(item) == 5 :
-                                    ChIni, ChEnd = item.split('-')
-                                    for Chn in range(int(ChIni),int(ChEnd)+1):
-                                        ChannelList.append('{:02d}'.format(Chn))
-
-
-        Downloaded_files = []
-
-        # ---------- Loop -------------------
-        DateTimeIniLoop = DateTimeIni.replace(minute=0)
-        DateTimeFinLoop = DateTimeFin.replace(minute=0)+timedelta(minutes=60)
-        while DateTimeIniLoop < DateTimeFinLoop :
-
-            DateTimeFolder = DateTimeIniLoop.strftime('%Y/%j/%H/')
-
-            server = 'gs://gcp-public-data-goes-'+Sat+'/'+Product+'/'+DateTimeFolder
-            #list_gc = !gsutil ls $server
-            list_gc = subprocess.run(['gsutil','ls',server], capture_output=True, text=True).stdout
-            list_gc = list(list_gc.split('\n'))[:-1]
-
-            ListFiles = np.array(list_gc)
-
-            for line in ListFiles:
-                if Product[:-1] in ['ABI-L1b-Rad','ABI-L2-CMIP']:
-                    NameFile = line.split('/')[-1]
-                    ChannelFile = NameFile.split('_')[1][-2:]
-                    DateTimeFile = datetime.strptime(NameFile[NameFile.find('_s')+2:NameFile.find('_e')-1], '%Y%j%H%M%S')
-
-                    if Product2 in NameFile    and    ChannelFile in ChannelList    and    DateTimeIni <= DateTimeFile <= DateTimeFin:
-
-                        NameOut = NameFile
-
-                        if os.path.isfile(path_out+NameFile) == True:
-                            #size_in_server = !gsutil du $line
-                            #size_in_server = int(size_in_server[0].split()[0])
-                            size_in_server = subprocess.run(['gsutil','du',line], capture_output=True, text=True).stdout
-                            size_in_server = int(size_in_server.split(' ')[0])
-                            size_in_folder = os.path.getsize(path_out+NameFile)
-                            if size_in_server == size_in_folder:
-                                print('{} already exists.'.format(NameFile))
-                            else:
-                                #!gsutil -q cp $line $path_out
-                                subprocess.run(['gsutil','-q','cp',line,path_out])
-                                size = os.path.getsize(path_out+NameFile)/dsize #
-                                print('{} {:.1f}MB [Replaced]'.format(NameFile,size))
-                        else:
-                            #!gsutil -q cp $line $path_out
-                            subprocess.run(['gsutil','-q','cp',line,path_out])
-                            size = os.path.getsize(path_out+NameFile)/dsize #
-                            print('{} {:.1f}MB'.format(NameFile,size))
-
-                        Downloaded_files.append(path_out+NameOut)
-
-                else:
-                    NameFile = line.split('/')[-1]
-                    DateTimeFile = datetime.strptime(NameFile[NameFile.find('_s')+2:NameFile.find('_e')-1], '%Y%j%H%M%S')
-
-                    if Product2 in NameFile    and    DateTimeIni <= DateTimeFile <= DateTimeFin:
-
-                        NameOut = NameFile
-
-                        if os.path.isfile(path_out+NameFile) == True:
-                            #size_in_server = !gsutil du $line
-                            #size_in_server = int(size_in_server[0].split()[0])
-                            size_in_server = subprocess.run(['gsutil','du',line], capture_output=True, text=True).stdout
-                            size_in_server = int(size_in_server.split(' ')[0])
-                            size_in_folder = os.path.getsize(path_out+NameFile)
-                            if size_in_server == size_in_folder:
-                                print('{} already exists.'.format(NameFile))
-                            else:
-                                #!gsutil -q cp $line $path_out
-                                subprocess.run(['gsutil','-q','cp',line,path_out])
-                                size = os.path.getsize(path_out+NameFile)/dsize #
-                                print('{} {:.1f}MB [Replaced]'.format(NameFile,size))
-
-                        else:
-                            #!gsutil -q cp $line $path_out
-                            subprocess.run(['gsutil','-q','cp',line,path_out])
-                            size = os.path.getsize(path_out+NameFile)/dsize #
-                            print('{} {:.1f}MB'.format(NameFile,size))
-
-                        Downloaded_files.append(path_out+NameOut)
-
-            DateTimeIniLoop = DateTimeIniLoop + timedelta(minutes=60)
-
-        Downloaded_files.sort()
+    if client is None:
+        client = download_client(pool_size=max(workers,10), storage='gcs')
 
-        return Downloaded_files;
-
-    else:
-        print('\n  This function only work in Colab\n')
+    return download(Satellite, Product, DateTimeIni=DateTimeIni, DateTimeFin=DateTimeFin, domain=domain, channel=channel, path_out=path_out,
+                    size_format=size_format, show_download_progress=show_download_progress, overwrite_file=overwrite_file, workers=workers, client=client);
 
 #-----------------------------------------------------------------------------------------------------------------------------------
 
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#-----------------------------------------------------------------------------------------------------------------------------------
+'''
+Description: Command goes-sync, that keeps a local archive of GOES-16/17/18/19 data in sync with the server
+Author: Joao Henry Huaman Chinchay
+E-mail: joaohenry23@gmail.com
+Created date: Oct 18, 2026
+Modification date: Oct 18, 2026
+'''
+#-----------------------------------------------------------------------------------------------------------------------------------
+import argparse
+import json
+import os
+import sys
+
+from .download_data import sync, download_client
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def _parse_spec(text):
+
+    '''
+
+    Converts a product of command line (Satellite/Product[/channels[/domain]],
+    for example goes16/ABI-L2-CMIPF/08-10,13 or goes16/ABI-L2-CMIPM/13/M1)
+    in a spec of sync().
+
+    '''
+
+    Items = text.split('/')
+    if len(Items) < 2 or len(Items) > 4:
+        raise argparse.ArgumentTypeError('product must be Satellite/Product[/channels[/domain]]: {}'.format(text))
+
+    Spec = {'Satellite':Items[0], 'Product':Items[1]}
+    if len(Items) > 2 and Items[2] != '':
+        Spec['channel'] = Items[2].split(',')
+    if len(Items) > 3:
+        Spec['domain'] = Items[3]
+
+    return Spec;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def main(argv=None):
+
+    '''
+
+    Entry point of command goes-sync.
+
+    Example
+    -------
+        goes-sync /data/archive/ -p goes16/ABI-L2-CMIPF/13 -p goes16/GLM-L2-LCFA --start 20200520-000000 --workers 16 --report sync.jsonl
+
+    '''
+
+    parser = argparse.ArgumentParser(prog='goes-sync', description='Keeps a local archive of GOES data in sync with the server. '
+                                     'The files are saved with the structure of the buckets (<path_out>/<bucket>/<Product>/YYYY/DDD/HH/).')
+    parser.add_argument('path_out', help='folder of archive')
+    parser.add_argument('-p', '--product', dest='specs', action='append', type=_parse_spec, default=[], metavar='PRODUCT',
+                        help='product synchronized, as Satellite/Product[/channels[/domain]] (for example goes16/ABI-L2-CMIPF/08-10,13); it can be repeated')
+    parser.add_argument('--specs', dest='specs_file', metavar='FILE', help='JSON file with a list of specs (dicts with Satellite, Product and optionally domain, channel and scan_mode)')
+    parser.add_argument('--start', help='initial datetime of archive (yyyymmdd-HHMMSS), by default lookback hours before now')
+    parser.add_argument('--end', help='final datetime of archive (yyyymmdd-HHMMSS), by default the synchronization never ends')
+    parser.add_argument('--lookback', type=float, default=3, help='hours checked in each cycle (default 3)')
+    parser.add_argument('--interval', type=float, default=300, help='seconds between two cycles (default 300)')
+    parser.add_argument('--once', action='store_true', help='synchronize once and exit')
+    parser.add_argument('--workers', type=int, default=8, help='files downloaded at the same time (default 8)')
+    parser.add_argument('--parts', type=int, default=1, help='byte ranges downloaded at the same time of each large file (default 1)')
+    parser.add_argument('--max-rate', type=float, default=None, help='maximum rate of downloads in MB/s')
+    parser.add_argument('--retries', type=int, default=10, help='retries of each request (default 10)')
+    parser.add_argument('--timeout', type=float, default=None, help='seconds to wait for the server')
+    parser.add_argument('--storage', default='s3', choices=['s3', 'gcs'], help='storage of data (default s3)')
+    parser.add_argument('--cache', default=None, help='folder of a local_cache shared with other jobs')
+    parser.add_argument('--report', default=None, help='file where the report of each cycle is appended as JSON')
+    parser.add_argument('--progress', action='store_true', help='show each file downloaded')
+    args = parser.parse_args(argv)
+
+    specs = list(args.specs)
+    if args.specs_file is not None:
+        with open(args.specs_file, 'r') as specs_file:
+            specs.extend(json.load(specs_file))
+    if len(specs) == 0:
+        parser.error('at least one product (-p) or a file of specs (--specs) is required')
+
+    client = download_client(retries=args.retries, pool_size=max(args.workers*args.parts,10), timeout=args.timeout, storage=args.storage,
+                             listing_cache=os.path.join(args.path_out, '.goes-sync', 'listings'),
+                             max_rate=None if args.max_rate is None else args.max_rate*1e6, cache=args.cache)
+
+    try:
+        Reports = sync(specs, args.path_out, DateTimeIni=args.start, DateTimeFin=args.end, lookback=args.lookback, interval=args.interval,
+                       cycles=1 if args.once == True else None, workers=args.workers, parts=args.parts, client=client, report=args.report,
+                       show_download_progress=args.progress)
+    except KeyboardInterrupt:
+        # the interrupted downloads continue from their '.part' files in the next run
+        print('\nSynchronization stopped.')
+        return 130;
+    finally:
+        client.close()
+
+    if Reports is None:
+        return 2;
+    # the errors of the cycles do not stop the synchronization, they are reported when it ends (--once or --end)
+    if len(Reports) > 0 and (Reports[-1]['failed'] > 0 or Reports[-1]['error'] is not None):
+        return 1;
+
+    return 0;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,7 +5,7 @@ Description: Process the GOES-16/17/18 data
 Author: Joao Henry Huaman Chinchay
 E-mail: joaohenry23@gmail.com
 Created date: Mar 23, 2020
-Modification date: Apr 07, 2024
+Modification date: Oct 18, 2026
 '''
 #-----------------------------------------------------------------------------------------------------------------------------------
 import numpy as np
@@ -16,6 +16,10 @@ import glob
 import os
 import warnings
 import re
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 warnings.filterwarnings('ignore')
 
 #-----------------------------------------------------------------------------------------------------------------------------------
@@ -135,10 +139,134 @@ class GOES():
 
 #-----------------------------------------------------------------------------------------------------------------------------------
 
+def _open_remote_dataset(URL):
+
+    '''
+
+    Opens a file of server. The URLs of the buckets of Amazon (s3://) and
+    Google Cloud (gs://) are converted to https URLs, which are opened by
+    the byte range mode of netCDF library (#mode=bytes), so only the
+    metadata and the chunks of data that are required are transferred. The
+    chunks already read are kept in the chunk cache of HDF5.
+
+    '''
+
+    Protocol, Path = URL.split('://', 1)
+
+    if Protocol == 's3':
+        Bucket, Key = Path.split('/', 1)
+        URL = 'https://{}.s3.amazonaws.com/{}'.format(Bucket, Key)
+    elif Protocol == 'gs':
+        URL = 'https://storage.googleapis.com/{}'.format(Path)
+    elif Protocol not in ['http', 'https']:
+        # other filesystems of fsspec can not be read by parts, so the file is read in memory
+        import fsspec
+        with fsspec.open(URL, 'rb') as remote_file:
+            data = remote_file.read()
+        return Dataset(Path.split('/')[-1], memory=data);
+
+    if '#' not in URL:
+        URL = URL+'#mode=bytes'
+
+    return Dataset(URL);
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+
+def _cached_file(URL, cache):
+
+    '''
+
+    Returns the file of URL saved in the cache, downloading it if it is not
+    saved. The key of file is the URL, as in the downloads of
+    download_client with cache.
+
+    '''
+
+    from ..downloads.download_data import local_cache, download_client, download_file
+
+    if isinstance(cache, str):
+        cache = local_cache(cache)
+
+    Protocol, Path = URL.split('://', 1)
+    if Protocol == 's3':
+        Bucket, Key = Path.split('/', 1)
+        Link = 'https://{}.s3.amazonaws.com/{}'.format(Bucket, Key)
+    elif Protocol == 'gs':
+        Link = 'https://storage.googleapis.com/{}'.format(Path)
+    else:
+        Link = URL
+
+    def fetch_file(folder, name):
+        client = download_client()
+        try:
+            download_file(Link, name, folder, show_download_progress=False, overwrite_file=True, client=client, use_cache=False)
+        finally:
+            client.close()
+
+    return cache.fetch(URL, URL.split('/')[-1], fetch_file);
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+
 class open_dataset():
 
-    def __init__(self, File):
-        self.ds = Dataset(File)
+    def __init__(self, File, memory=None, cache=None):
+
+        '''
+
+        Opens a GOES file.
+
+        Parameters
+        ----------
+        File : str
+            Name of file (path+filename) or URL of file in the cloud.
+            If File is a URL of the Amazon or Google Cloud buckets (for
+            example 's3://noaa-goes16/ABI-L1b-RadF/2020/140/18/OR_...nc' or
+            'gs://gcp-public-data-goes-16/ABI-L1b-RadF/...') or an http(s)
+            URL, the file is not downloaded: only the blocks of data required
+            by each variable or image (including the domain selected) are
+            read from the server using byte range requests. URLs of other
+            fsspec filesystems are read completely in memory.
+
+        memory : bytes or None, optional, default None
+            Content of file already loaded in memory. If it is defined, the
+            file is not read from disk and File is used just as its name.
+
+        cache : local_cache, str or None, optional, default None
+            Cache of files (see local_cache) or its folder. If it is defined
+            and File is a URL, the complete file is downloaded once in the
+            cache and then it is opened from the disk.
+
+        '''
+
+        if memory is not None:
+            self.ds = Dataset(File, memory=memory)
+        elif '://' in File and cache is not None:
+            self.ds = Dataset(_cached_file(File, cache))
+        elif '://' in File:
+            self.ds = _open_remote_dataset(File)
+        else:
+            self.ds = Dataset(File)
+
+
+    @classmethod
+    def from_bytes(cls, data, name='memory.nc'):
+
+        '''
+
+        Opens a GOES file whose content is in memory, for example the
+        content returned by GOES.download_file(..., to_memory=True).
+
+        Parameters
+        ----------
+        data : bytes
+            Content of file.
+
+        name : str, optional, default 'memory.nc'
+            Name given to dataset.
+
+        '''
+
+        return cls(name, memory=bytes(data));
 
 
     def attribute(self, parameter):
@@ -322,7 +450,7 @@ class open_dataset():
 
 
 
-    def image(self, parameter, lonlat='center', domain=None, domain_in_pixels=None, up_level=False, nan_mask=None, delta_index=4, fmt=np.float32):
+    def image(self, parameter, lonlat='center', domain=None, domain_in_pixels=None, up_level=False, nan_mask=None, delta_index=4, fmt=np.float32, cache=False, lonlat_step=None):
 
         '''
 
@@ -402,6 +530,16 @@ class open_dataset():
         fmt : dtype, optional, default np.float32
             The type of the returns (Field, Lons and Lats).
 
+        cache : boolean or geolocation_cache, optional, default False
+            Cache of the longitudes and latitudes, see get_lonlat().
+
+        lonlat_step : int or None, optional, default None
+            If it is defined, the longitudes and latitudes are calculated
+            exactly every lonlat_step pixels and interpolated between them
+            (see step of get_lonlat()), which is faster but approximated.
+            An estimate of the maximum error is given in the attribute
+            max_error of Lons and Lats.
+
 
         Returns
         -------
@@ -461,7 +599,7 @@ class open_dataset():
                 if isinstance(domain, list) or isinstance(domain, np.ndarray):
 
                     LLLon, URLon, LLLat, URLat = domain
-                    Lons, Lats = get_lonlat(X[::delta_index].astype(fmt), Y[::delta_index].astype(fmt), PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt)
+                    Lons, Lats = get_lonlat(X[::delta_index].astype(fmt), Y[::delta_index].astype(fmt), PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt, cache=cache)
 
                     xpixmin, xpixmax, ypixmin, ypixmax = find_pixels_of_region(Lons, Lats, LLLon, URLon, LLLat, URLat)
                     del Lons, Lats
@@ -499,7 +637,7 @@ class open_dataset():
 
                     #- - - - - - - - - - - - - - - - - - -
 
-                    Lons, Lats = get_lonlat(X[xini:xfin+1].astype(fmt), Y[yini:yfin+1].astype(fmt), PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt)
+                    Lons, Lats = get_lonlat(X[xini:xfin+1].astype(fmt), Y[yini:yfin+1].astype(fmt), PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt, cache=cache, step=lonlat_step)
 
                     xpixmin, xpixmax, ypixmin, ypixmax = find_pixels_of_region(Lons, Lats, LLLon, URLon, LLLat, URLat)
                     Limits = np.array([xini+xpixmin, xini+xpixmax, yini+ypixmin, yini+ypixmax])
@@ -514,7 +652,7 @@ class open_dataset():
                         dict_Lats.data = np.ascontiguousarray(Lats.data[ypixmin:ypixmax+1,xpixmin:xpixmax+1], dtype=fmt)
 
                     elif lonlat == 'corner':
-                        Lons, Lats = get_lonlatcorner(X[xini+xpixmin:xini+xpixmax+1].astype(fmt), Y[yini+ypixmin:yini+ypixmax+1].astype(fmt), PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt)
+                        Lons, Lats = get_lonlatcorner(X[xini+xpixmin:xini+xpixmax+1].astype(fmt), Y[yini+ypixmin:yini+ypixmax+1].astype(fmt), PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt, cache=cache, step=lonlat_step)
                         del X, Y
                         dict_Lons = Lons
                         dict_Lats = Lats
@@ -527,13 +665,13 @@ class open_dataset():
                     dict_Field['pixels_limits'] = Limits
 
                     if lonlat == 'center':
-                        Lons, Lats = get_lonlat(X[xpixmin:xpixmax+1].astype(fmt), Y[ypixmin:ypixmax+1].astype(fmt), PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt)
+                        Lons, Lats = get_lonlat(X[xpixmin:xpixmax+1].astype(fmt), Y[ypixmin:ypixmax+1].astype(fmt), PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt, cache=cache, step=lonlat_step)
                         del X, Y
                         dict_Lons = Lons
                         dict_Lats = Lats
 
                     elif lonlat == 'corner':
-                        Lons, Lats = get_lonlatcorner(X[xpixmin:xpixmax+1].astype(fmt), Y[ypixmin:ypixmax+1].astype(fmt), PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt)
+                        Lons, Lats = get_lonlatcorner(X[xpixmin:xpixmax+1].astype(fmt), Y[ypixmin:ypixmax+1].astype(fmt), PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt, cache=cache, step=lonlat_step)
                         del X, Y
                         dict_Lons = Lons
                         dict_Lats = Lats
@@ -545,13 +683,13 @@ class open_dataset():
                     dict_Field['pixels_limits'] = Limits
 
                     if lonlat == 'center':
-                        Lons, Lats = get_lonlat(X[:].astype(fmt), Y[:].astype(fmt), PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt)
+                        Lons, Lats = get_lonlat(X[:].astype(fmt), Y[:].astype(fmt), PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt, cache=cache, step=lonlat_step)
                         del X, Y
                         dict_Lons = Lons
                         dict_Lats = Lats
 
                     elif lonlat == 'corner':
-                        Lons, Lats = get_lonlatcorner(X[:].astype(fmt), Y[:].astype(fmt), PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt)
+                        Lons, Lats = get_lonlatcorner(X[:].astype(fmt), Y[:].astype(fmt), PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt, cache=cache, step=lonlat_step)
                         del X, Y
                         dict_Lons = Lons
                         dict_Lats = Lats
@@ -1062,13 +1200,414 @@ class open_mfdataset():
 
 #-----------------------------------------------------------------------------------------------------------------------------------
 
-def get_lonlat(X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt=np.float32):
+class geolocation_cache():
+
+    '''
+
+    Cache of the longitudes and latitudes calculated by get_lonlat() and
+    get_lonlatcorner(). The fixed grid of the images of a satellite is the
+    same in every file of the same domain and resolution, so the
+    geolocation of a time series is calculated just for the first file.
+    The arrays are kept in memory (the least recently used are removed when
+    they exceed max_size) and optionally in a folder of the disk, to be
+    reused by other sessions of python.
+
+    The key of arrays includes the platform, longitude, height and sweep
+    of satellite, the type of data, center or corners, and a fingerprint of
+    the scanning angles X and Y (so the slices of a domain have their own
+    key).
+
+    Parameters
+    ----------
+    max_size : int, optional, default 512*1000*1000
+        Maximum size in bytes of the arrays kept in memory. The arrays
+        greater than max_size are not kept in memory.
+
+    path : str or None, optional, default None
+        Folder where the arrays are saved as .npz files. If path=None the
+        arrays are kept only in memory.
+
+    Example
+    -------
+        cache = GOES.geolocation_cache(path='/data/goes_geolocation/')
+        for File in Files:
+            ds = GOES.open_dataset(File)
+            CMI, LonCen, LatCen = ds.image('CMI', domain=[-90.0,-60.0,-20.0,10.0], cache=cache)
+
+    '''
+
+    def __init__(self, max_size=512*1000*1000, path=None):
+        self.max_size = max_size
+        self.path = path
+        self.size = 0
+        self.arrays = OrderedDict()
+        self.lock = threading.Lock()
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+
+    def get(self, key):
+
+        '''
+
+        Returns the arrays (Lons, Lats) of key, or None if they are not saved.
+
+        '''
+
+        with self.lock:
+            if key in self.arrays:
+                self.arrays.move_to_end(key)
+                return self.arrays[key];
+
+        if self.path is not None:
+            try:
+                with np.load(self._file(key)) as data:
+                    Lons, Lats = data['lons'], data['lats']
+            except (IOError, ValueError, KeyError):
+                return None
+            self._keep(key, Lons, Lats)
+            return Lons, Lats;
+
+        return None
+
+
+    def put(self, key, Lons, Lats):
+
+        '''
+
+        Saves the arrays (Lons, Lats) of key. The arrays kept in memory are
+        copies, so the arrays of caller can be modified.
+
+        '''
+
+        # the arrays are copied only if they are kept in memory
+        if Lons.nbytes+Lats.nbytes <= self.max_size:
+            self._keep(key, Lons.copy(), Lats.copy())
+        if self.path is not None:
+            # the file is written in a temporary file and renamed, so other processes never read it incomplete
+            File = self._file(key)
+            FileTemp = '{}.{}.{}.tmp.npz'.format(File[:-4], os.getpid(), threading.get_ident())
+            np.savez(FileTemp, lons=Lons, lats=Lats)
+            os.replace(FileTemp, File)
+
+
+    def clear(self):
+
+        '''
+
+        Removes the arrays kept in memory (the files of disk are kept).
+
+        '''
+
+        with self.lock:
+            self.arrays.clear()
+            self.size = 0
+
+
+    def _file(self, key):
+        return os.path.join(self.path, hashlib.sha256(repr(key).encode('utf-8')).hexdigest()+'.npz');
+
+
+    def _keep(self, key, Lons, Lats):
+        nbytes = Lons.nbytes+Lats.nbytes
+        if nbytes > self.max_size:
+            return
+        # the arrays are shared by the calls, so they are read only
+        Lons.setflags(write=False)
+        Lats.setflags(write=False)
+        with self.lock:
+            if key in self.arrays:
+                self.size = self.size-sum([item.nbytes for item in self.arrays.pop(key)])
+            self.arrays[key] = (Lons, Lats)
+            self.size = self.size+nbytes
+            while self.size > self.max_size:
+                _, Arrays = self.arrays.popitem(last=False)
+                self.size = self.size-sum([item.nbytes for item in Arrays])
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+
+_default_geolocation_cache = geolocation_cache()
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+
+def _geolocation_key(kind, X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt):
+
+    '''
+
+    Returns the key of geolocation_cache of a grid, with a fingerprint of
+    the scanning angles X and Y.
+
+    '''
+
+    Fingerprints = []
+    for Angles in [X, Y]:
+        Angles = np.ascontiguousarray(np.ma.getdata(Angles[:]))
+        Fingerprints.append('{}:{}:{}'.format(Angles.dtype.str, Angles.shape[0], hashlib.sha1(Angles.tobytes()).hexdigest()))
+
+    return (kind, str(PlatformID), float(SatLon), float(SatHeight), str(SatSweep), np.dtype(fmt).str, Fingerprints[0], Fingerprints[1]);
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+
+def _get_geolocation_cache(cache):
+
+    '''
+
+    Returns the geolocation_cache of the parameter cache of get_lonlat():
+    the default cache if cache=True, or None if cache=False or None.
+
+    '''
+
+    if cache is True:
+        return _default_geolocation_cache;
+    if cache is False or cache is None:
+        return None
+
+    return cache;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+
+def _fixed_grid_to_lonlat(X, Y, PlatformID, SatLon, SatHeight, fmt=np.float32, block_size=1<<20):
+
+    '''
+
+    Calculates the longitude and latitude of a fixed grid using the
+    equations of the GOES-R Product User Guide (PUG, section 5.1.2.8.1) for
+    the sweep-angle axis 'x' (GRS80 ellipsoid). The scanning angles X and Y
+    (1-D, radians) are combined by broadcasting instead of meshgrid, the
+    computation is made in the type fmt and the rows are processed in blocks
+    of block_size pixels by several threads, applying the mask of pixels out
+    of the disk (-999.99) and the longitude wrap of GOES-17/18 in each block.
+
+    '''
+
+    fmt = np.dtype(fmt).type
+    req = 6378137.0
+    rpol = 6356752.31414
+    # the distances are in units of the equatorial radius, so the equations are well conditioned in float32
+    H = (SatHeight+req)/req
+    C = H*H-1.0
+    K = (req*req)/(rpol*rpol)
+
+    X = np.asarray(np.ma.getdata(X[:]), dtype=np.float64)
+    Y = np.asarray(np.ma.getdata(Y[:]), dtype=np.float64)
+    CosX = np.cos(X).astype(fmt)
+    SinX = np.sin(X).astype(fmt)
+    CosY = np.cos(Y).astype(fmt)
+    SinY = np.sin(Y).astype(fmt)
+    CosX2 = (np.cos(X)**2).astype(fmt)
+    CSinX2 = (C*np.sin(X)**2).astype(fmt)
+    # terms of the discriminant that depend only on the row, B*B-A*C = CosX2*DY-C*SinX2
+    DY = (np.cos(Y)**2+K*np.sin(Y)**2-H*H*K*np.sin(Y)**2).astype(fmt)
+    H, C, K = fmt(H), fmt(C), fmt(K)
+    Rad2Deg = fmt(180.0/np.pi)
+    Lon0 = fmt(SatLon)
+
+    Lons = np.empty((Y.shape[0], X.shape[0]), dtype=fmt)
+    Lats = np.empty((Y.shape[0], X.shape[0]), dtype=fmt)
+
+    def process_rows(ini, fin):
+        CosXCosY = CosX[None,:]*CosY[ini:fin,None]
+        Disc = CosX2[None,:]*DY[ini:fin,None]-CSinX2[None,:]
+        Valid = Disc >= 0
+        np.sqrt(np.maximum(Disc, 0, out=Disc), out=Disc)
+        # distance from the satellite to the surface, (B-sqrt(Disc))/A written without cancellation
+        Rs = C/(H*CosXCosY+Disc)
+        Dist = H-Rs*CosXCosY
+        Sy = Rs*SinX[None,:]
+        Sz = Rs*CosX[None,:]*SinY[ini:fin,None]
+        Lat = np.arctan(K*Sz/np.sqrt(Dist*Dist+Sy*Sy))*Rad2Deg
+        Lon = Lon0+np.arctan(Sy/Dist)*Rad2Deg
+        # the longitudes are given in [-180, 180] as pyproj, except GOES-17/18 that are given west of -180
+        Lon = np.where(Lon > 180, Lon-360, np.where(Lon < -180, Lon+360, Lon))
+        if PlatformID == 'G17' or PlatformID == 'G18':
+            Lon = np.where(Lon > 0, Lon-360, Lon)
+        Lons[ini:fin] = np.where(Valid, Lon, fmt(-999.99))
+        Lats[ini:fin] = np.where(Valid, Lat, fmt(-999.99))
+
+    rows = max(block_size//max(X.shape[0],1), 1)
+    Blocks = [(ini, min(ini+rows, Y.shape[0])) for ini in range(0, Y.shape[0], rows)]
+    if len(Blocks) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(Blocks), os.cpu_count() or 1)) as executor:
+            for future in [executor.submit(process_rows, ini, fin) for ini, fin in Blocks]:
+                future.result()
+    else:
+        for ini, fin in Blocks:
+            process_rows(ini, fin)
+
+    return Lons, Lats;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+
+def _exact_lonlat(X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt=np.float32):
+
+    '''
+
+    Calculates the longitude and latitude of the grid of scanning angles X
+    and Y (1-D, radians). The pixels out of the disk are set as -999.99.
+
+    '''
+
+    if SatSweep == 'x':
+        return _fixed_grid_to_lonlat(X, Y, PlatformID, SatLon, SatHeight, fmt=fmt);
+
+    X = X[:]*SatHeight
+    Y = Y[:]*SatHeight
+    X, Y = np.meshgrid(X, Y)
+    proj = Proj(proj='geos', h=SatHeight, lon_0=SatLon, sweep=SatSweep)
+    Lons, Lats = proj(X, Y, inverse=True)
+
+    if PlatformID == 'G17' or PlatformID == 'G18':
+        Lons = np.where(Lons>0,Lons-360,Lons)
+
+    Lons = np.where((Lons>=-360.0)&(Lons<=360.0)&(Lats>=-90.0)&(Lats<=90.0),Lons,-999.99).astype(fmt)
+    Lats = np.where((Lons>=-360.0)&(Lons<=360.0)&(Lats>=-90.0)&(Lats<=90.0),Lats,-999.99).astype(fmt)
+
+    return Lons, Lats;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+
+# the error of a cell of _interpolated_lonlat is measured in its central pixel, so it must be lower than tolerance/_INTERPOLATION_MARGIN
+_INTERPOLATION_MARGIN = 1.25
+
+def _interpolated_lonlat(X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt=np.float32, step=8, tolerance=0.01):
+
+    '''
+
+    Calculates the longitude and latitude of the grid of scanning angles X
+    and Y approximately. The exact values are calculated every step pixels
+    (lattice) and the pixels between them are interpolated bilinearly (the
+    scanning angles are equally spaced, so the interpolation is made in the
+    scanning angle space). The error of each cell of lattice is estimated
+    with the exact value of its central pixel, and the cells whose error is
+    greater than tolerance/_INTERPOLATION_MARGIN (degrees) or that touch the
+    edge of the disk are calculated exactly. The margin is used because the
+    error of the other pixels of a cell can be greater than in its center.
+
+    Return
+    ------
+    Lons, Lats : ndarray
+        Longitudes and latitudes of the pixels.
+
+    MaxError : float
+        Estimate of the maximum error in degrees, measured in the centers of
+        the interpolated cells. The error of other pixels can be a little
+        greater, the margin of tolerance is used to keep it lower than
+        tolerance.
+
+    '''
+
+    X = np.asarray(np.ma.getdata(X[:]), dtype=np.float64)
+    Y = np.asarray(np.ma.getdata(Y[:]), dtype=np.float64)
+    nx = X.shape[0]
+    ny = Y.shape[0]
+    if nx < 2 or ny < 2:
+        Lons, Lats = _exact_lonlat(X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt)
+        return Lons, Lats, 0.0;
+
+    # ---------- Lattice -------------------
+    IX = np.unique(np.append(np.arange(0, nx, step), nx-1))
+    IY = np.unique(np.append(np.arange(0, ny, step), ny-1))
+    LatticeLons, LatticeLats = _exact_lonlat(X[IX], Y[IY], PlatformID, SatLon, SatHeight, SatSweep, fmt=np.float64)
+    # the longitudes are interpolated without jumps of 360 degrees around the satellite,
+    # and the pixels out of disk are nan, so the cells that touch the edge of disk are nan
+    Valid = LatticeLons != -999.99
+    LatticeLons = np.where(Valid, (LatticeLons-SatLon+180.0)%360.0-180.0+SatLon, np.nan)
+    LatticeLats = np.where(Valid, LatticeLats, np.nan)
+
+    def weights(Index, size):
+        Cell = np.minimum(np.searchsorted(Index, np.arange(size), side='right')-1, Index.shape[0]-2)
+        return Cell, (np.arange(size)-Index[Cell])/(Index[Cell+1]-Index[Cell]);
+
+    CellX, WX = weights(IX, nx)
+    CellY, WY = weights(IY, ny)
+
+    # the lattice is interpolated first in each column (x), so each row of pixels is a combination of two rows of lattice
+    RowsLons = (LatticeLons[:,CellX]*(1-WX)+LatticeLons[:,CellX+1]*WX).astype(fmt)
+    RowsLats = (LatticeLats[:,CellX]*(1-WX)+LatticeLats[:,CellX+1]*WX).astype(fmt)
+    WY = WY.astype(fmt)
+
+    # ---------- Error -------------------
+    # the interpolated values in the centers of cells are compared with their exact values
+    CX = (IX[:-1]+IX[1:])//2
+    CY = (IY[:-1]+IY[1:])//2
+    CenterLons, CenterLats = _exact_lonlat(X[CX], Y[CY], PlatformID, SatLon, SatHeight, SatSweep, fmt=np.float64)
+    Cells = np.arange(CY.shape[0])
+    InterpLons = RowsLons[Cells][:,CX]*(1-WY[CY])[:,None]+RowsLons[Cells+1][:,CX]*WY[CY][:,None]
+    InterpLats = RowsLats[Cells][:,CX]*(1-WY[CY])[:,None]+RowsLats[Cells+1][:,CX]*WY[CY][:,None]
+    ErrorLons = np.abs((InterpLons-CenterLons+180.0)%360.0-180.0)
+    ErrorLats = np.abs(InterpLats-CenterLats)
+    Error = np.where(CenterLons != -999.99, np.maximum(ErrorLons, ErrorLats), np.inf)
+    # the maximum error of a cell can be out of its center (near the edge of disk), so the cells are accepted with a
+    # margin of tolerance, and the cells with nan (edge of disk) are also bad cells
+    Bad = ~(Error <= tolerance/_INTERPOLATION_MARGIN)
+    MaxError = float(Error[~Bad].max()) if np.any(~Bad) else 0.0
+
+    # the disk is smaller far from the nadir, so a cell without pixels of nadir row or column is out of the disk if its corners are
+    Corners = Valid[:-1,:-1] | Valid[:-1,1:] | Valid[1:,:-1] | Valid[1:,1:]
+    Axes = (np.sign(X[IX[:-1]]) != np.sign(X[IX[1:]]))[None,:] | (np.sign(Y[IY[:-1]]) != np.sign(Y[IY[1:]]))[:,None]
+    Outside = Bad & ~Corners & ~Axes
+
+    # ---------- Interpolation -------------------
+    LonMin, LonMax = np.nanmin(LatticeLons), np.nanmax(LatticeLons)
+    Wrap = LonMin < -180 or LonMax > 180
+    # the wrap of GOES-17/18 is required if some longitude is positive before or after the wrap to [-180, 180]
+    West = (PlatformID == 'G17' or PlatformID == 'G18') and (LonMax > 0 or LonMin < -180)
+
+    Lons = np.empty((ny, nx), dtype=fmt)
+    Lats = np.empty((ny, nx), dtype=fmt)
+
+    def process_cells(ini, fin):
+        for row in range(ini, fin):
+            y0 = IY[row]
+            y1 = IY[row+1]+1 if row == IY.shape[0]-2 else IY[row+1]
+            W = WY[y0:y1,None]
+            for Out, Rows in [(Lons, RowsLons), (Lats, RowsLats)]:
+                np.multiply(Rows[row+1]-Rows[row], W, out=Out[y0:y1])
+                Out[y0:y1] += Rows[row]
+            # the longitudes are given in [-180, 180] as pyproj, except GOES-17/18 that are given west of -180
+            if Wrap == True:
+                Lons[y0:y1] = np.where(Lons[y0:y1] > 180, Lons[y0:y1]-360, np.where(Lons[y0:y1] < -180, Lons[y0:y1]+360, Lons[y0:y1]))
+            if West == True:
+                Lons[y0:y1] = np.where(Lons[y0:y1] > 0, Lons[y0:y1]-360, Lons[y0:y1])
+
+    rows = max((1<<20)//(nx*step), 1)
+    Blocks = [(ini, min(ini+rows, IY.shape[0]-1)) for ini in range(0, IY.shape[0]-1, rows)]
+    if len(Blocks) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(Blocks), os.cpu_count() or 1)) as executor:
+            for future in [executor.submit(process_cells, ini, fin) for ini, fin in Blocks]:
+                future.result()
+    else:
+        process_cells(0, IY.shape[0]-1)
+
+    # ---------- Fallback -------------------
+    # the cells out of disk are undefined and the other bad cells of each row of lattice are calculated exactly, joining the consecutive cells
+    for row in range(Bad.shape[0]):
+        y0, y1 = IY[row], IY[row+1]+1
+        for Mask, exact in [(Outside[row], False), (Bad[row] & ~Outside[row], True)]:
+            Cols = np.nonzero(Mask)[0]
+            if Cols.shape[0] == 0:
+                continue
+            for Run in np.split(Cols, np.nonzero(np.diff(Cols) > 1)[0]+1):
+                x0, x1 = IX[Run[0]], IX[Run[-1]+1]+1
+                if exact == True:
+                    Lons[y0:y1,x0:x1], Lats[y0:y1,x0:x1] = _exact_lonlat(X[x0:x1], Y[y0:y1], PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt)
+                else:
+                    Lons[y0:y1,x0:x1] = -999.99
+                    Lats[y0:y1,x0:x1] = -999.99
+
+    return Lons, Lats, MaxError;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+
+def get_lonlat(X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt=np.float32, cache=False, step=None, tolerance=0.01):
 
     '''
 
     Calculates the longitude and latitude of the center of the pixels,
     corresponding to the satellite image, using the fixed grid East/West and
-    North/South scanning angle in radians of pixels.
+    North/South scanning angle in radians of pixels. For the sweep-angle
+    axis 'x' of GOES-R the equations of the Product User Guide are
+    calculated directly in the type fmt, otherwise pyproj is used.
 
 
     Parameters
@@ -1096,6 +1635,28 @@ def get_lonlat(X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt=np.float32):
     fmt : dtype, optional, default np.float32
         The type of the returns.
 
+    cache : boolean or geolocation_cache, optional, default False
+        If cache=True the longitudes and latitudes are kept in a cache in
+        memory shared by all the calls (up to 512 MB), so they are
+        calculated once for each grid. A geolocation_cache can be given to
+        define the size of cache or to save the arrays in disk. If
+        cache=False the cache is not used.
+
+    step : int or None, optional, default None
+        If it is defined, the longitudes and latitudes are calculated
+        exactly every step pixels and interpolated bilinearly between them,
+        which is about step*step times cheaper. The cells of step*step
+        pixels whose error (estimated in their central pixel, with a margin
+        of 25%) could be greater than tolerance, or that touch the edge of
+        the disk, are calculated exactly. An estimate of the maximum error
+        (the greatest error measured in the centers of cells) is returned in
+        the attribute max_error of Lons and Lats. The interpolated arrays
+        are not kept in the cache. If step=None the values are exact.
+
+    tolerance : float, optional, default 0.01
+        Maximum error in degrees of the cells interpolated when step is
+        defined.
+
 
     Returns
     -------
@@ -1109,17 +1670,24 @@ def get_lonlat(X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt=np.float32):
 
     '''
 
-    X = X[:]*SatHeight
-    Y = Y[:]*SatHeight
-    X, Y = np.meshgrid(X, Y)
-    proj = Proj(proj='geos', h=SatHeight, lon_0=SatLon, sweep=SatSweep)
-    Lons, Lats = proj(X, Y, inverse=True)
-
-    if PlatformID == 'G17' or PlatformID == 'G18':
-        Lons = np.where(Lons>0,Lons-360,Lons)
+    MaxError = None
+    Cache = _get_geolocation_cache(cache)
+    if step is not None and step > 1:
+        Lons, Lats, MaxError = _interpolated_lonlat(X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt, step=step, tolerance=tolerance)
+    else:
+        if Cache is not None:
+            Key = _geolocation_key('center', X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt)
+            Cached = Cache.get(Key)
+        else:
+            Cached = None
 
-    Lons = np.where((Lons>=-360.0)&(Lons<=360.0)&(Lats>=-90.0)&(Lats<=90.0),Lons,-999.99).astype(fmt)
-    Lats = np.where((Lons>=-360.0)&(Lons<=360.0)&(Lats>=-90.0)&(Lats<=90.0),Lats,-999.99).astype(fmt)
+        if Cached is not None:
+            # the arrays of cache are copied, so they are not modified by the user
+            Lons, Lats = Cached[0].copy(), Cached[1].copy()
+        else:
+            Lons, Lats = _exact_lonlat(X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt)
+            if Cache is not None:
+                Cache.put(Key, Lons, Lats)
 
     dict_Lons = {'long_name':'Longitude of center of pixels', 'standard_name':'pixels center longitude',
                  'units':'degrees_east', 'undef':-999.99, 'axis':'YX', 'dimensions':('y','x'), 'data':Lons}
@@ -1127,17 +1695,23 @@ def get_lonlat(X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt=np.float32):
     dict_Lats = {'long_name':'Latitude of center of pixels', 'standard_name':'pixels center latitude',
                  'units':'degrees_north', 'undef':-999.99, 'axis':'YX', 'dimensions':('y','x'), 'data':Lats}
 
+    if MaxError is not None:
+        dict_Lons['max_error'] = MaxError
+        dict_Lats['max_error'] = MaxError
+
     return GOES(dict_Lons), GOES(dict_Lats);
 
 #-----------------------------------------------------------------------------------------------------------------------------------
 
-def get_lonlatcorner(X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt=np.float32):
+def get_lonlatcorner(X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt=np.float32, cache=False, step=None, tolerance=0.01):
 
     '''
 
     Calculates the longitude and latitude of the corners of the pixels,
     corresponding to the satellite image, using the fixed grid East/West and
-    North/South scanning angle in radians of pixels.
+    North/South scanning angle in radians of pixels. For the sweep-angle
+    axis 'x' of GOES-R the equations of the Product User Guide are
+    calculated directly in the type fmt, otherwise pyproj is used.
 
 
     Parameters
@@ -1165,6 +1739,28 @@ def get_lonlatcorner(X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt=np.float
     fmt : dtype, optional, default np.float32
         The type of the returns.
 
+    cache : boolean or geolocation_cache, optional, default False
+        If cache=True the longitudes and latitudes are kept in a cache in
+        memory shared by all the calls (up to 512 MB), so they are
+        calculated once for each grid. A geolocation_cache can be given to
+        define the size of cache or to save the arrays in disk. If
+        cache=False the cache is not used.
+
+    step : int or None, optional, default None
+        If it is defined, the longitudes and latitudes are calculated
+        exactly every step pixels and interpolated bilinearly between them,
+        which is about step*step times cheaper. The cells of step*step
+        pixels whose error (estimated in their central pixel, with a margin
+        of 25%) could be greater than tolerance, or that touch the edge of
+        the disk, are calculated exactly. An estimate of the maximum error
+        (the greatest error measured in the centers of cells) is returned in
+        the attribute max_error of Lons and Lats. The interpolated arrays
+        are not kept in the cache. If step=None the values are exact.
+
+    tolerance : float, optional, default 0.01
+        Maximum error in degrees of the cells interpolated when step is
+        defined.
+
 
     Returns
     -------
@@ -1178,21 +1774,32 @@ def get_lonlatcorner(X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt=np.float
 
     '''
 
-    X = X[:]*SatHeight
-    Y = Y[:]*SatHeight
-    dx = X[1]-X[0]
-    dy = Y[1]-Y[0]
-    XCor = np.concatenate([X, [X[-1]+dx]])-dx/2
-    YCor = np.concatenate([Y, [Y[-1]+dy]])-dy/2
-    XCor, YCor = np.meshgrid(XCor, YCor)
-    proj = Proj(proj='geos', h=SatHeight, lon_0=SatLon, sweep=SatSweep)
-    Lons, Lats = proj(XCor, YCor, inverse=True)
-
-    if PlatformID == 'G17' or PlatformID == 'G18':
-        Lons = np.where(Lons>0,Lons-360,Lons)
+    # the corners are in the middle of the scanning angles of pixels
+    XCen = np.asarray(np.ma.getdata(X[:]), dtype=np.float64)
+    YCen = np.asarray(np.ma.getdata(Y[:]), dtype=np.float64)
+    dx = XCen[1]-XCen[0]
+    dy = YCen[1]-YCen[0]
+    XCor = np.concatenate([XCen, [XCen[-1]+dx]])-dx/2
+    YCor = np.concatenate([YCen, [YCen[-1]+dy]])-dy/2
+
+    MaxError = None
+    Cache = _get_geolocation_cache(cache)
+    if step is not None and step > 1:
+        Lons, Lats, MaxError = _interpolated_lonlat(XCor, YCor, PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt, step=step, tolerance=tolerance)
+    else:
+        if Cache is not None:
+            Key = _geolocation_key('corner', X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt)
+            Cached = Cache.get(Key)
+        else:
+            Cached = None
 
-    Lons = np.where((Lons>=-360.0)&(Lons<=360.0)&(Lats>=-90.0)&(Lats<=90.0),Lons,-999.99).astype(fmt)
-    Lats = np.where((Lons>=-360.0)&(Lons<=360.0)&(Lats>=-90.0)&(Lats<=90.0),Lats,-999.99).astype(fmt)
+        if Cached is not None:
+            # the arrays of cache are copied, so they are not modified by the user
+            Lons, Lats = Cached[0].copy(), Cached[1].copy()
+        else:
+            Lons, Lats = _exact_lonlat(XCor, YCor, PlatformID, SatLon, SatHeight, SatSweep, fmt=fmt)
+            if Cache is not None:
+                Cache.put(Key, Lons, Lats)
 
     dict_Lons = {'long_name':'Longitude of corners of pixels', 'standard_name':'pixels corners longitude',
                  'units':'degrees_east', 'undef':-999.99, 'axis':'YX', 'dimensions':('y','x'), 'data':Lons}
@@ -1200,6 +1807,10 @@ def get_lonlatcorner(X, Y, PlatformID, SatLon, SatHeight, SatSweep, fmt=np.float
     dict_Lats = {'long_name':'Latitude of corners of pixels', 'standard_name':'pixels corners latitude',
                  'units':'degrees_north', 'undef':-999.99, 'axis':'YX', 'dimensions':('y','x'), 'data':Lats}
 
+    if MaxError is not None:
+        dict_Lons['max_error'] = MaxError
+        dict_Lats['max_error'] = MaxError
+
     return GOES(dict_Lons), GOES(dict_Lats);
 
 #-----------------------------------------------------------------------------------------------------------------------------------
@@ -1596,6 +2207,100 @@ def create_gridmap(Domain, PixResol=2.0, fmt=np.float32):
 
 #-----------------------------------------------------------------------------------------------------------------------------------
 
+def _digits_to_datetime64(Digits):
+
+    '''
+
+    Converts a matrix of digits (n, 14) with the format YYYYjjjHHMMSSt of
+    the names of GOES files into datetime64[ms].
+
+    '''
+
+    Year = Digits[:,0]*1000 + Digits[:,1]*100 + Digits[:,2]*10 + Digits[:,3]
+    DayOfYear = Digits[:,4]*100 + Digits[:,5]*10 + Digits[:,6]
+    Milliseconds = ((Digits[:,7]*10 + Digits[:,8])*3600000 + (Digits[:,9]*10 + Digits[:,10])*60000
+                    + (Digits[:,11]*10 + Digits[:,12])*1000 + Digits[:,13]*100)
+    Date = (Year-1970).astype('datetime64[Y]').astype('datetime64[D]') + (DayOfYear-1).astype('timedelta64[D]')
+
+    return Date.astype('datetime64[ms]') + Milliseconds.astype('timedelta64[ms]');
+
+#-----------------------------------------------------------------------------------------------------------------------------------
+def parse_filenames(names):
+
+    '''
+
+    It parses the names of GOES files in one vectorized pass. The names have
+    the structure OR_<product>-<scan mode>C<channel>_<platform>_s<start>_e<end>_c<creation>.nc,
+    for example OR_ABI-L2-CMIPF-M6C13_G16_s20201401800200_e20201401809508_c20201401809579.nc
+
+    Parameters
+    ----------
+    names : list or ndarray
+        Names of files. They can include the path of files.
+
+    Returns
+    -------
+    Index : ndarray
+        Structured array with the fields:
+            name : name of file (without path)
+            product : product, like 'ABI-L2-CMIPF' or 'GLM-L2-LCFA'
+            scan_mode : scan mode of ABI products, like 'M6', or ''
+            channel : channel of ABI products, like '13', or ''
+            platform : satellite, like 'G16'
+            start : scan start time (datetime64[ms])
+            end : scan end time (datetime64[ms])
+            creation : creation time of file (datetime64[ms])
+        The times of names that do not have the structure of GOES files are
+        NaT.
+
+    Example
+    -------
+        Index = GOES.parse_filenames(files)
+        files13 = Index['name'][(Index['channel']=='13') & (Index['start']>=np.datetime64('2020-05-19T18:00'))]
+
+    '''
+
+    names = np.asarray(names, dtype=str).ravel()
+    nfiles = names.size
+
+    Index = np.zeros(nfiles, dtype=[('name', 'U{}'.format(max(names.dtype.itemsize//4, 1))), ('product', 'U32'), ('scan_mode', 'U2'), ('channel', 'U2'),
+                                    ('platform', 'U8'), ('start', 'datetime64[ms]'), ('end', 'datetime64[ms]'), ('creation', 'datetime64[ms]')])
+    if nfiles == 0:
+        return Index;
+
+    Index['name'] = np.char.rpartition(names, '/')[:,2]
+
+    # OR_<description>_<platform>_<times>
+    Parts = np.char.partition(np.char.partition(Index['name'], '_')[:,2], '_')
+    Description = Parts[:,0]
+    Parts = np.char.partition(Parts[:,2], '_')
+    Index['platform'] = Parts[:,0]
+    Times = Parts[:,2]
+
+    # the description of ABI products ends with the scan mode and channel: ABI-L2-CMIPF-M6C13 or ABI-L2-ACHAF-M6
+    Head, _, Tail = np.moveaxis(np.char.rpartition(Description, '-'), -1, 0)
+    TailCodes = np.asarray(Tail, dtype='U5').view(np.uint32).reshape(nfiles, 5)
+    TailLen = np.char.str_len(Tail)
+    IsMode = np.char.startswith(Description, 'ABI-') & (TailCodes[:,0] == ord('M')) & (TailCodes[:,1] >= ord('0')) & (TailCodes[:,1] <= ord('9'))
+    IsChannel = IsMode & (TailLen == 5) & (TailCodes[:,2] == ord('C'))
+    IsMode = IsMode & ((TailLen == 2) | IsChannel)
+
+    Index['product'] = np.where(IsMode, Head, Description)
+    Index['scan_mode'] = np.where(IsMode, np.ascontiguousarray(TailCodes[:,0:2]).view('U2').ravel(), '')
+    Index['channel'] = np.where(IsChannel, np.ascontiguousarray(TailCodes[:,3:5]).view('U2').ravel(), '')
+
+    # s<14 digits>_e<14 digits>_c<14 digits>, the digits are read from the codes of characters
+    Codes = np.asarray(Times, dtype='U47').view(np.uint32).reshape(nfiles, 47).astype(np.int64)
+    for field, marker, col in [('start','s',0), ('end','e',16), ('creation','c',32)]:
+        Digits = Codes[:,col+1:col+15] - ord('0')
+        Valid = (Codes[:,col] == ord(marker)) & np.all((Digits >= 0) & (Digits <= 9), axis=1)
+        # the names without the structure are converted with a valid date and replaced by NaT
+        Digits[Valid==False] = [1,9,7,0,0,0,1,0,0,0,0,0,0,0]
+        Index[field] = np.where(Valid, _digits_to_datetime64(Digits), np.datetime64('NaT'))
+
+    return Index;
+
+#-----------------------------------------------------------------------------------------------------------------------------------
 def locate_files(path, prefix, datetime_ini, datetime_fin, use_parameter='scan_start_time'):
 
     '''
@@ -1647,49 +2352,23 @@ def locate_files(path, prefix, datetime_ini, datetime_fin, use_parameter='scan_s
             datetime_fin = datetime.datetime.strptime(datetime_fin,'%Y%m%d-%H%M%S')
 
 
-        l = sorted(glob.glob(path+prefix))
-
-        if use_parameter=='scan_start_time':
+        l = np.array(sorted(glob.glob(path+prefix)), dtype=str)
 
-            ini_datetime = []
-            for file in l:
-                datetimestr = file[file.find('_s')+2:file.find('_e')]
-                ini_datetime.append(datetime.datetime.strptime(datetimestr,'%Y%j%H%M%S%f'))
-
-
-            ini_datetime = np.array(ini_datetime)
-            mask = np.where((ini_datetime>=datetime_ini)&(ini_datetime<datetime_fin),True,False)
-            l = np.array(l)
+        # the times of names are parsed at once
+        Index = parse_filenames(l)
+        ini_datetime = Index['start']
+        fin_datetime = Index['end']
+        datetime_ini = np.datetime64(datetime_ini)
+        datetime_fin = np.datetime64(datetime_fin)
 
+        if use_parameter=='scan_start_time':
+            mask = (ini_datetime>=datetime_ini)&(ini_datetime<datetime_fin)
 
         elif use_parameter=='scan_end_time':
-
-            fin_datetime = []
-            for file in l:
-                datetimestr = file[file.find('_e')+2:file.find('_c')]
-                fin_datetime.append(datetime.datetime.strptime(datetimestr,'%Y%j%H%M%S%f'))
-
-            fin_datetime = np.array(fin_datetime)
-            mask = np.where((fin_datetime>=datetime_ini)&(fin_datetime<datetime_fin),True,False)
-            l = np.array(l)
-
+            mask = (fin_datetime>=datetime_ini)&(fin_datetime<datetime_fin)
 
         elif use_parameter=='both':
-
-            ini_datetime = []
-            fin_datetime = []
-            for file in l:
-                datetimestr = file[file.find('_s')+2:file.find('_e')]
-                ini_datetime.append(datetime.datetime.strptime(datetimestr,'%Y%j%H%M%S%f'))
-
-                datetimestr = file[file.find('_e')+2:file.find('_c')]
-                fin_datetime.append(datetime.datetime.strptime(datetimestr,'%Y%j%H%M%S%f'))
-
-
-            ini_datetime = np.array(ini_datetime)
-            fin_datetime = np.array(fin_datetime)
-            mask = np.where((ini_datetime>=datetime_ini)&(fin_datetime<datetime_fin),True,False)
-            l = np.array(l)
+            mask = (ini_datetime>=datetime_ini)&(fin_datetime<datetime_fin)
 
 
         return list(l[mask==True]);
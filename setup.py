@@ -29,4 +29,9 @@ setuptools.setup(
         "pyproj",
         "netCDF4",
     ],
+    entry_points={
+        "console_scripts": [
+            "goes-sync=GOES.downloads.sync_command:main",
+        ],
+    },
 )